@@ -4,58 +4,434 @@ Flask web application for greyShift image processing.
 """
 
 import os
+import copy
+import json
+import time
 import uuid
+import queue
+import random
+import re
+import threading
+import atexit
 import logging
+import logging.handlers
+import zipfile
 import datetime
-from flask import Flask, render_template, request, jsonify, send_file, url_for
+import math
+import warnings
+try:
+    import fcntl
+except ImportError:  # Windows: fall back to a per-process budget
+    fcntl = None
+from concurrent.futures import ThreadPoolExecutor, as_completed, wait
+from contextlib import contextmanager
+from flask import Flask, Response, render_template, request, jsonify, send_file, url_for, g
 from werkzeug.utils import secure_filename
-from PIL import Image
+from PIL import Image, UnidentifiedImageError
 import tempfile
 import shutil
 from pathlib import Path
-from greyshift import GreyShift
+from zip_stream import ChunkWriter, open_stored_zip
+from greyshift import (GreyShift, PROFILE_DIR, load_profile, parse_bands, parse_scalars,
+                       resolve_profile_path)
 
 app = Flask(__name__)
 app.config['SECRET_KEY'] = 'your-secret-key-change-this'
 app.config['MAX_CONTENT_LENGTH'] = 64 * 1024 * 1024  # 64MB max file size
 
-# Configure logging for Docker
+# Per-route log sampling: comma-separated "path_prefix=rate" pairs, where rate
+# is the fraction of successful requests that get a log record (0 suppresses).
+# Requests that end in an error status are always logged.
+LOG_SAMPLING = os.environ.get('GREYSHIFT_LOG_SAMPLING', '/health=0,/files/=0.05,/tiles/=0.01')
+
+
+class JsonFormatter(logging.Formatter):
+    """Format log records as single-line JSON objects."""
+
+    def format(self, record):
+        entry = {
+            'time': self.formatTime(record, '%Y-%m-%d %H:%M:%S'),
+            'app': 'greyShift',
+            'level': record.levelname,
+            'message': record.getMessage(),
+        }
+        entry.update(getattr(record, 'fields', {}))
+        if record.exc_info:
+            entry['exception'] = self.formatException(record.exc_info)
+        return json.dumps(entry, default=str)
+
+
+class RecordQueueHandler(logging.handlers.QueueHandler):
+    """Queue records unformatted so the listener's JsonFormatter sees exc_info."""
+
+    def prepare(self, record):
+        # Merge args now, since they may change before the listener runs
+        record = copy.copy(record)
+        record.msg = record.getMessage()
+        record.args = None
+        return record
+
+
+def parse_log_sampling(spec):
+    """Parse a GREYSHIFT_LOG_SAMPLING string into (prefix, rate) pairs."""
+    rules = []
+    for item in spec.split(','):
+        if '=' not in item:
+            continue
+        prefix, rate = item.split('=', 1)
+        rules.append((prefix.strip(), max(0.0, min(1.0, float(rate)))))
+    # Longest prefix wins
+    rules.sort(key=lambda rule: len(rule[0]), reverse=True)
+    return rules
+
+
+# Configure logging for Docker: records are handed to a queue and written to
+# stdout by a background listener thread, so request threads never block on
+# the log driver.
+log_queue = queue.SimpleQueue()
+stream_handler = logging.StreamHandler()
+stream_handler.setFormatter(JsonFormatter())
+log_listener = logging.handlers.QueueListener(log_queue, stream_handler)
+log_listener.start()
+atexit.register(log_listener.stop)
+
+queue_handler = RecordQueueHandler(log_queue)
 logging.basicConfig(
-    level=logging.INFO,
-    format='%(asctime)s - greyShift - %(levelname)s - %(message)s',
-    datefmt='%Y-%m-%d %H:%M:%S',
+    level=os.environ.get('GREYSHIFT_LOG_LEVEL', 'INFO').upper(),
     handlers=[
-        logging.StreamHandler()
+        queue_handler
     ]
 )
 logger = logging.getLogger(__name__)
+log_sampling_rules = parse_log_sampling(LOG_SAMPLING)
 
 # Log startup
-logger.info("greyShift Flask application starting up")
-logger.info(f"Max file size: {app.config['MAX_CONTENT_LENGTH'] / (1024*1024):.0f}MB")
+logger.info("greyShift Flask application starting up", extra={'fields': {
+    'max_file_size_mb': round(app.config['MAX_CONTENT_LENGTH'] / (1024*1024)),
+}})
+
+
+def get_client_ip():
+    """Return the client IP, honouring X-Forwarded-For from the proxy."""
+    return request.environ.get('HTTP_X_FORWARDED_FOR', request.remote_addr)
+
+
+def log_fields(**fields):
+    """Attach fields to the consolidated log record for the current request."""
+    g.log_fields.update(fields)
+
+
+@contextmanager
+def log_stage(name):
+    """Time a processing stage and add it to the current request's record."""
+    start = time.perf_counter()
+    try:
+        yield
+    finally:
+        g.log_stages[name] = round((time.perf_counter() - start) * 1000, 2)
+
+
+def greyshift_stage_hook(event):
+    """Add GreyShift stage timings to the current request's log record."""
+    if event['phase'] == 'end':
+        key = f"greyshift.{event['stage']}"
+        g.log_stages[key] = round(g.log_stages.get(key, 0) + event['wall_time'] * 1000, 2)
+
+
+def should_log_request(path, status_code):
+    """Decide whether a request's record is emitted under the sampling rules."""
+    if status_code >= 400:
+        return True
+    for prefix, rate in log_sampling_rules:
+        if path.startswith(prefix):
+            return rate > 0 and random.random() < rate
+    return True
+
 
-# Middleware to log all requests
 @app.before_request
-def log_request_info():
-    """Log information about each incoming request."""
-    client_ip = request.environ.get('HTTP_X_FORWARDED_FOR', request.remote_addr)
-    logger.info(f"Request: {request.method} {request.path} - IP: {client_ip}")
+def start_request_log():
+    """Start collecting the per-request log record."""
+    g.request_start = time.perf_counter()
+    g.log_fields = {}
+    g.log_stages = {}
+
+
+@app.after_request
+def emit_request_log(response):
+    """Emit one structured log record per request."""
+    if not should_log_request(request.path, response.status_code):
+        return response
+    fields = {
+        'method': request.method,
+        'path': request.path,
+        'status': response.status_code,
+        'ip': get_client_ip(),
+        'duration_ms': round((time.perf_counter() - g.request_start) * 1000, 2),
+    }
+    if g.log_stages:
+        fields['stages_ms'] = g.log_stages
+    fields.update(g.log_fields)
+    if response.status_code >= 500:
+        level = logging.ERROR
+    elif response.status_code >= 400:
+        level = logging.WARNING
+    else:
+        level = logging.INFO
+    logger.log(level, "request", extra={'fields': fields})
+    return response
 
 # Create directories for uploads and processed images
 UPLOAD_FOLDER = 'uploads'
 PROCESSED_FOLDER = 'processed'
 DISPLAY_FOLDER = 'display'  # For UI display thumbnails
+PYRAMID_FOLDER = 'tiles'  # DeepZoom tile pyramids for zoomable viewing
 ALLOWED_EXTENSIONS = {'png', 'jpg', 'jpeg', 'tiff', 'bmp', 'webp'}
+PROFILE_NAME_PATTERN = re.compile(r'^[A-Za-z0-9_-]{1,64}$')
 
 os.makedirs(UPLOAD_FOLDER, exist_ok=True)
 os.makedirs(PROCESSED_FOLDER, exist_ok=True)
 os.makedirs(DISPLAY_FOLDER, exist_ok=True)
+os.makedirs(PYRAMID_FOLDER, exist_ok=True)
+
+# Tile pyramids are generated on every upload unless disabled
+TILE_PYRAMIDS = os.environ.get('GREYSHIFT_TILE_PYRAMIDS', '1') == '1'
+# Tile URLs contain a unique upload id and never change, so cache for a year
+TILE_CACHE_SECONDS = 365 * 24 * 3600
+UPLOAD_ID_PATTERN = re.compile(r'^[0-9a-f]{8}-[0-9a-f]{4}-[0-9a-f]{4}-[0-9a-f]{4}-[0-9a-f]{12}$')
+TILE_PATH_PATTERN = re.compile(r'^(original|processed)(\.dzi|_files/\d+/\d+_\d+\.jpg)$')
+
+# Admission control: every request that decodes an image reserves its pixel
+# count against a host-wide memory budget before the full decode happens.
+# Each pixel costs roughly 3 bytes decoded, plus the float32 working copies
+# made by GreyShift.apply_correction and the uint8 result.
+BYTES_PER_PIXEL = 40
+MEMORY_BUDGET_MB = float(os.environ.get('GREYSHIFT_MEMORY_BUDGET_MB', 2048))
+ADMISSION_TIMEOUT = float(os.environ.get('GREYSHIFT_ADMISSION_TIMEOUT', 10))
+ADMISSION_RETRY_AFTER = int(os.environ.get('GREYSHIFT_ADMISSION_RETRY_AFTER', 5))
+# Gunicorn workers are separate processes, so reservations are kept in a
+# ledger file shared by every worker on the host
+BUDGET_LEDGER_PATH = os.environ.get(
+    'GREYSHIFT_BUDGET_LEDGER', os.path.join(tempfile.gettempdir(), 'greyshift-pixel-budget.json')
+)
+ADMISSION_POLL_INTERVAL = 0.1
+
+# Per-route decompression-bomb limits, in megapixels
+ROUTE_MAX_MEGAPIXELS = {
+    'upload_file': float(os.environ.get('GREYSHIFT_UPLOAD_MAX_MP', 150)),
+    'analyze_image': float(os.environ.get('GREYSHIFT_ANALYZE_MAX_MP', 150)),
+    'batch_upload': float(os.environ.get('GREYSHIFT_BATCH_MAX_MP', 150)),
+    'create_profile': float(os.environ.get('GREYSHIFT_ANALYZE_MAX_MP', 150)),
+    'sweep_upload': float(os.environ.get('GREYSHIFT_SWEEP_MAX_MP', 150)),
+}
+
+# Let the route limits decide what is too large. Pillow warns above
+# MAX_IMAGE_PIXELS and raises above twice that, so tie it to the largest
+# route limit. Anything it would warn about is then rejected with a logged
+# 413, and the plain-text warning on stderr is dropped.
+_largest_route_limit = max(ROUTE_MAX_MEGAPIXELS.values())
+Image.MAX_IMAGE_PIXELS = (int(_largest_route_limit * 1e6)
+                          if math.isfinite(_largest_route_limit) else None)
+warnings.simplefilter('ignore', Image.DecompressionBombWarning)
+
+
+class ImageRejected(Exception):
+    """Base for upload rejections answered by the app-wide error handlers."""
+
+
+class AdmissionRejected(ImageRejected):
+    """Raised when an image cannot be admitted within the pixel budget."""
+
+    def __init__(self, message, retry_after=ADMISSION_RETRY_AFTER):
+        super().__init__(message)
+        self.retry_after = retry_after
+
+
+class ImageTooLarge(ImageRejected):
+    """Raised when an image exceeds the route's decompression-bomb limit."""
+
+
+class InvalidImage(ImageRejected):
+    """Raised when an upload cannot be identified as an image."""
+
+
+class PixelBudget:
+    """Track the pixels being processed on this host and cap their total.
+
+    Reservations are recorded per process id in a JSON ledger guarded by an
+    exclusive file lock, so every gunicorn worker sees the same total.
+    Entries of processes that have died are dropped on the next access.
+    """
+
+    def __init__(self, max_bytes, bytes_per_pixel=BYTES_PER_PIXEL,
+                 ledger_path=BUDGET_LEDGER_PATH):
+        self.max_pixels = int(max_bytes // bytes_per_pixel)
+        self.bytes_per_pixel = bytes_per_pixel
+        self.ledger_path = ledger_path
+        # Wakes waiting threads in this process early when budget is released
+        self._condition = threading.Condition()
+        self._local_lock = threading.Lock()
+        self._local_ledger = {}
+
+    def estimate_bytes(self, pixels):
+        """Estimate peak memory needed to process an image of this many pixels."""
+        return pixels * self.bytes_per_pixel
+
+    @contextmanager
+    def _ledger(self):
+        """Yield the {pid: pixels} ledger locked; changes are written back."""
+        if fcntl is None:
+            with self._local_lock:
+                yield self._local_ledger
+            return
+        with open(self.ledger_path, 'a+') as ledger_file:
+            fcntl.flock(ledger_file, fcntl.LOCK_EX)
+            try:
+                ledger_file.seek(0)
+                try:
+                    ledger = json.loads(ledger_file.read() or '{}')
+                except ValueError:
+                    ledger = {}
+                for pid in list(ledger):
+                    if int(pid) != os.getpid() and not process_alive(int(pid)):
+                        del ledger[pid]
+                yield ledger
+                ledger_file.seek(0)
+                ledger_file.truncate()
+                ledger_file.write(json.dumps({pid: pixels for pid, pixels in ledger.items()
+                                              if pixels > 0}))
+                ledger_file.flush()
+            finally:
+                fcntl.flock(ledger_file, fcntl.LOCK_UN)
+
+    def in_flight(self):
+        """Return the pixels currently reserved on this host."""
+        with self._ledger() as ledger:
+            return sum(ledger.values())
+
+    def acquire(self, pixels, timeout=ADMISSION_TIMEOUT):
+        """Wait until the pixels fit in the budget and reserve them.
+
+        An image larger than the whole budget is still admitted once nothing
+        else is in flight, so the route limit alone decides what is too big.
+        """
+        deadline = None if timeout is None else time.monotonic() + timeout
+        pid = str(os.getpid())
+        while True:
+            with self._ledger() as ledger:
+                in_flight = sum(ledger.values())
+                if in_flight == 0 or in_flight + pixels <= self.max_pixels:
+                    ledger[pid] = ledger.get(pid, 0) + pixels
+                    return
+            if deadline is not None and time.monotonic() >= deadline:
+                raise AdmissionRejected(
+                    f"Server busy: {in_flight / 1e6:.1f}MP already in flight"
+                )
+            # Other workers release without notifying us, so poll as well
+            with self._condition:
+                self._condition.wait(ADMISSION_POLL_INTERVAL)
+
+    def release(self, pixels):
+        """Return reserved pixels to the budget and wake waiting requests."""
+        pid = str(os.getpid())
+        with self._ledger() as ledger:
+            ledger[pid] = ledger.get(pid, 0) - pixels
+        with self._condition:
+            self._condition.notify_all()
+
+
+def process_alive(pid):
+    """Return True if a process with this id is still running."""
+    try:
+        os.kill(pid, 0)
+    except ProcessLookupError:
+        return False
+    except PermissionError:
+        return True
+    return True
+
+
+pixel_budget = PixelBudget(MEMORY_BUDGET_MB * 1024 * 1024)
+
+
+def read_image_dimensions(file_storage):
+    """Read (width, height) from an uploaded image header without decoding it."""
+    try:
+        with Image.open(file_storage.stream) as img:
+            size = img.size
+    except Image.DecompressionBombError as e:
+        raise ImageTooLarge(str(e))
+    except UnidentifiedImageError:
+        raise InvalidImage(f"{file_storage.filename} is not a readable image")
+    finally:
+        file_storage.stream.seek(0)
+    return size
+
+
+@contextmanager
+def admit_image(file_storage):
+    """Check the route's pixel limit and hold budget for the upload's pixels."""
+    width, height = read_image_dimensions(file_storage)
+    pixels = width * height
+    max_pixels = ROUTE_MAX_MEGAPIXELS.get(request.endpoint, float('inf')) * 1e6
+    if pixels > max_pixels:
+        raise ImageTooLarge(
+            f"Image is {pixels / 1e6:.1f}MP, limit is {max_pixels / 1e6:.1f}MP"
+        )
+    log_fields(megapixels=round(pixels / 1e6, 2),
+               estimated_mb=round(pixel_budget.estimate_bytes(pixels) / (1024*1024), 1))
+    with log_stage('admission_wait'):
+        pixel_budget.acquire(pixels)
+    try:
+        yield width, height
+    finally:
+        pixel_budget.release(pixels)
+
+
+def rejection_response(message, status_code):
+    """Build a JSON error response in the shape the current route uses."""
+    body = {'error': message}
+    if request.endpoint == 'analyze_image':
+        body = {'success': False, **body}
+    response = jsonify(body)
+    response.status_code = status_code
+    return response
+
+
+@app.errorhandler(ImageTooLarge)
+def image_too_large(error):
+    """Reject an image over the route's pixel limit."""
+    log_fields(error=str(error))
+    return rejection_response(f'Image too large: {error}', 413)
+
+
+@app.errorhandler(InvalidImage)
+def invalid_image(error):
+    """Reject an upload that is not a readable image."""
+    log_fields(error=str(error))
+    return rejection_response(str(error), 400)
+
+
+@app.errorhandler(AdmissionRejected)
+def admission_rejected(error):
+    """Build a 429 response telling the client when to retry."""
+    log_fields(error=str(error))
+    response = rejection_response(str(error), 429)
+    response.headers['Retry-After'] = str(error.retry_after)
+    return response
+
 
 def allowed_file(filename):
     """Check if the file extension is allowed."""
     return '.' in filename and \
            filename.rsplit('.', 1)[1].lower() in ALLOWED_EXTENSIONS
 
+def greyshift_download_name(original_filename, scalar):
+    """Build the download name: original name + _greyshift_scalar(value) + extension."""
+    name_parts = original_filename.rsplit('.', 1)
+    if len(name_parts) == 2:
+        return f"{name_parts[0]}_greyshift_scalar({scalar}).{name_parts[1]}"
+    return f"{original_filename}_greyshift_scalar({scalar})"
+
 def create_display_thumbnail(image_path, output_path):
     """Create a display thumbnail: 480x720 for portrait, 720x480 for landscape."""
     try:
@@ -88,53 +464,274 @@ def create_display_thumbnail(image_path, output_path):
             img.save(output_path, quality=90, optimize=True)
             return False
     except Exception as e:
-        logger.error(f"Error creating display thumbnail: {e}")
+        logger.error("Error creating display thumbnail",
+                     extra={'fields': {'path': str(image_path), 'error': str(e)}})
         # If thumbnail creation fails, copy original
         shutil.copy2(image_path, output_path)
         return False
 
 
+def analyze_saved_image(image_path, bands=None):
+    """Run tonal analysis on a saved upload, downscaled to 3280px if larger."""
+    processor = GreyShift(filepath=image_path, scalar=1.0, quiet=True,
+                          hooks=[greyshift_stage_hook], bands=bands)
+    
+    # Load and check size
+    with log_stage('load'):
+        original_img = Image.open(image_path)
+        if original_img.mode != 'RGB':
+            original_img = original_img.convert('RGB')
+        
+        original_width, original_height = original_img.size
+        max_dimension = max(original_width, original_height)
+        
+        if max_dimension > 3280:
+            # Resize for analysis
+            scale_factor = 3280 / max_dimension
+            analysis_width = int(original_width * scale_factor)
+            analysis_height = int(original_height * scale_factor)
+            processor.img = original_img.resize((analysis_width, analysis_height), Image.Resampling.LANCZOS)
+        else:
+            processor.img = original_img
+    
+    processor.analyze_tonal_ranges()
+    return processor
+
+
+def get_request_profile():
+    """Load the correction profile named in the request's 'profile' field.
+
+    Returns None when no profile was requested.
+    """
+    name = request.form.get('profile', '').strip()
+    if not name:
+        return None
+    if not PROFILE_NAME_PATTERN.match(name):
+        raise ValueError('Profile names may only contain letters, digits, - and _')
+    return load_profile(name)
+
+
+def get_request_bands(profile=None):
+    """Parse the tonal band layout in the request's 'bands' field.
+
+    Returns None (the default layout) when no bands were given. Bands are
+    rejected alongside a profile, whose offsets replace the analysis.
+    """
+    spec = request.form.get('bands', '').strip()
+    if not spec:
+        return None
+    if profile:
+        raise ValueError('bands cannot be combined with profile; '
+                         'set the bands when creating the profile')
+    return parse_bands(spec)
+
+
 def cleanup_old_files():
     """Clean up old uploaded and processed files."""
-    import time
     current_time = time.time()
     
-    for folder in [UPLOAD_FOLDER, PROCESSED_FOLDER, DISPLAY_FOLDER]:
+    for folder in [UPLOAD_FOLDER, PROCESSED_FOLDER, DISPLAY_FOLDER, PYRAMID_FOLDER]:
         for file_path in Path(folder).glob('*'):
             if current_time - file_path.stat().st_mtime > 3600:  # 1 hour old
                 try:
-                    os.remove(file_path)
+                    if file_path.is_dir():
+                        shutil.rmtree(file_path)
+                    else:
+                        os.remove(file_path)
                 except OSError:
                     pass
 
+
+# Batch processing: uploads are corrected on a worker pool shared by all
+# batch requests, and results are streamed back in a ZIP as they finish.
+BATCH_WORKERS = int(os.environ.get('GREYSHIFT_BATCH_WORKERS', 2))
+BATCH_MAX_FILES = int(os.environ.get('GREYSHIFT_BATCH_MAX_FILES', 500))
+# Cap on the uncompressed size of an uploaded ZIP's image entries
+BATCH_MAX_EXTRACT_MB = float(os.environ.get('GREYSHIFT_BATCH_MAX_EXTRACT_MB', 1024))
+
+batch_executor = ThreadPoolExecutor(max_workers=BATCH_WORKERS,
+                                    thread_name_prefix='greyshift-batch')
+
+
+def save_batch_inputs(batch_dir):
+    """Save the request's images, or the images inside one ZIP, to batch_dir.
+
+    Returns a list of (original filename, saved path) in upload order.
+    """
+    uploads = [file for file in request.files.getlist('files') if file.filename]
+    if 'file' in request.files and request.files['file'].filename:
+        uploads.append(request.files['file'])
+    
+    inputs = []
+    for file in uploads:
+        if file.filename.lower().endswith('.zip'):
+            inputs.extend(extract_batch_zip(file, batch_dir, len(inputs)))
+        elif allowed_file(file.filename):
+            filename = secure_filename(file.filename)
+            saved_path = os.path.join(batch_dir, f"{len(inputs):04d}_{filename}")
+            file.save(saved_path)
+            inputs.append((filename, saved_path))
+        else:
+            raise ValueError(f"Invalid file type: {file.filename}")
+        if len(inputs) > BATCH_MAX_FILES:
+            raise ValueError(f"Too many files, limit is {BATCH_MAX_FILES}")
+    return inputs
+
+
+def extract_batch_zip(file, batch_dir, start_index):
+    """Extract the supported images from an uploaded ZIP into batch_dir."""
+    inputs = []
+    with zipfile.ZipFile(file.stream) as archive:
+        members = [info for info in archive.infolist()
+                   if not info.is_dir() and allowed_file(info.filename)
+                   and not os.path.basename(info.filename).startswith('.')]
+        # Check the entry count before anything is written to disk
+        if start_index + len(members) > BATCH_MAX_FILES:
+            raise ValueError(f"Too many files, limit is {BATCH_MAX_FILES}")
+        total_bytes = sum(info.file_size for info in members)
+        if total_bytes > BATCH_MAX_EXTRACT_MB * 1024 * 1024:
+            raise ValueError(
+                f"ZIP contents too large, limit is {BATCH_MAX_EXTRACT_MB:.0f}MB"
+            )
+        for info in members:
+            filename = secure_filename(os.path.basename(info.filename))
+            saved_path = os.path.join(
+                batch_dir, f"{start_index + len(inputs):04d}_{filename}"
+            )
+            with archive.open(info) as source, open(saved_path, 'wb') as target:
+                shutil.copyfileobj(source, target)
+            inputs.append((filename, saved_path))
+    return inputs
+
+
+def process_batch_item(input_path, scalar, profile=None, bands=None):
+    """Correct one saved batch image; runs on a batch worker thread.
+
+    Returns (output path, (width, height), processing time in seconds).
+    """
+    try:
+        with Image.open(input_path) as img:
+            width, height = img.size
+    except Image.DecompressionBombError as e:
+        raise ImageTooLarge(str(e))
+    pixels = width * height
+    max_pixels = ROUTE_MAX_MEGAPIXELS['batch_upload'] * 1e6
+    if pixels > max_pixels:
+        raise ImageTooLarge(
+            f"Image is {pixels / 1e6:.1f}MP, limit is {max_pixels / 1e6:.1f}MP"
+        )
+    
+    # The worker pool bounds concurrency, so wait for budget without a timeout
+    pixel_budget.acquire(pixels, timeout=None)
+    try:
+        start_time = time.perf_counter()
+        processor = GreyShift(filepath=input_path, scalar=scalar, quiet=True,
+                              profile=profile, bands=bands)
+        output_path = processor.process_with_memory_optimization(max_dimension=3280)
+        return output_path, (width, height), time.perf_counter() - start_time
+    finally:
+        pixel_budget.release(pixels)
+
+
+def unique_archive_name(name, used_names):
+    """Return name, or name with a _2, _3... suffix if already in the archive."""
+    candidate = name
+    stem, dot, extension = name.rpartition('.')
+    if not dot:
+        stem, extension = name, ''
+    counter = 2
+    while candidate in used_names:
+        candidate = f"{stem}_{counter}{dot}{extension}"
+        counter += 1
+    used_names.add(candidate)
+    return candidate
+
+
+def stream_batch_zip(inputs, scalar, batch_dir, profile=None, bands=None):
+    """Submit a batch to the worker pool and yield ZIP bytes as files finish.
+
+    The last entry, manifest.json, records the outcome of every input file.
+    The batch directory is removed once the stream ends or is abandoned.
+    """
+    writer = ChunkWriter()
+    futures = {}
+    manifest = []
+    used_names = {'manifest.json'}
+    start_time = time.perf_counter()
+    try:
+        for index, (filename, input_path) in enumerate(inputs):
+            future = batch_executor.submit(process_batch_item, input_path, scalar,
+                                           profile, bands)
+            futures[future] = (index, filename, input_path)
+        
+        with open_stored_zip(writer) as archive:
+            for future in as_completed(futures):
+                index, filename, input_path = futures[future]
+                entry = {'index': index, 'file': filename}
+                try:
+                    output_path, size, processing_time = future.result()
+                except Exception as e:
+                    # Report errors against the upload name, not the temp path
+                    entry.update(status='error',
+                                 error=str(e).replace(input_path, filename))
+                else:
+                    output_name = unique_archive_name(
+                        greyshift_download_name(filename, scalar), used_names
+                    )
+                    archive.write(output_path, output_name)
+                    os.remove(output_path)
+                    entry.update(status='ok', output=output_name,
+                                 size=f"{size[0]}×{size[1]}",
+                                 processing_time_s=round(processing_time, 2))
+                manifest.append(entry)
+                yield writer.drain()
+            
+            manifest.sort(key=lambda entry: entry['index'])
+            archive.writestr('manifest.json', json.dumps({
+                'scalar': scalar,
+                'profile': profile['name'] if profile else None,
+                'files': manifest,
+            }, indent=2, ensure_ascii=False))
+        yield writer.drain()
+        
+        logger.info("batch", extra={'fields': {
+            'files': len(inputs),
+            'failed': sum(1 for entry in manifest if entry['status'] == 'error'),
+            'scalar': scalar,
+            'duration_ms': round((time.perf_counter() - start_time) * 1000, 2),
+        }})
+    finally:
+        # Stop queued work if the client went away, then remove the inputs
+        for future in futures:
+            future.cancel()
+        wait(futures)
+        shutil.rmtree(batch_dir, ignore_errors=True)
+
 @app.route('/')
 def index():
     """Main page with upload form."""
-    client_ip = request.environ.get('HTTP_X_FORWARDED_FOR', request.remote_addr)
-    user_agent = request.headers.get('User-Agent', 'Unknown')
-    logger.info(f"Page visit - IP: {client_ip}, User-Agent: {user_agent}")
+    log_fields(user_agent=request.headers.get('User-Agent', 'Unknown'))
     
-    cleanup_old_files()
+    with log_stage('cleanup'):
+        cleanup_old_files()
     return render_template('index.html')
 
 @app.route('/upload', methods=['POST'])
 def upload_file():
     """Handle file upload and processing."""
-    client_ip = request.environ.get('HTTP_X_FORWARDED_FOR', request.remote_addr)
-    
     try:
         # Check if file was uploaded
         if 'file' not in request.files:
-            logger.warning(f"Upload attempt without file - IP: {client_ip}")
+            log_fields(error='Upload attempt without file')
             return jsonify({'error': 'No file selected'}), 400
         
         file = request.files['file']
         if file.filename == '':
-            logger.warning(f"Upload attempt with empty filename - IP: {client_ip}")
+            log_fields(error='Upload attempt with empty filename')
             return jsonify({'error': 'No file selected'}), 400
         
         if not allowed_file(file.filename):
-            logger.warning(f"Invalid file type upload: {file.filename} - IP: {client_ip}")
+            log_fields(error='Invalid file type', filename=file.filename)
             return jsonify({'error': 'Invalid file type. Please upload an image.'}), 400
         
         # Get parameters
@@ -144,6 +741,14 @@ def upload_file():
         if scalar <= 0 or scalar > 1:
             return jsonify({'error': 'Scalar must be between 0 and 1'}), 400
         
+        # Optional saved correction profile replaces per-image analysis
+        try:
+            profile = get_request_profile()
+            bands = get_request_bands(profile)
+        except (ValueError, FileNotFoundError) as e:
+            log_fields(error=str(e))
+            return jsonify({'error': str(e)}), 400
+        
         # Generate unique filename
         unique_id = str(uuid.uuid4())
         filename = secure_filename(file.filename)
@@ -151,226 +756,443 @@ def upload_file():
         file_size = len(file.read())
         file.seek(0)  # Reset file pointer after reading size
         
-        logger.info(f"Processing started - File: {filename}, Size: {file_size/1024:.1f}KB, Scalar: {scalar}, IP: {client_ip}")
+        log_fields(filename=filename, size_kb=round(file_size / 1024, 1), scalar=scalar,
+                   profile=profile['name'] if profile else None,
+                   bands=len(bands) if bands else None)
         
-        # Save uploaded file
-        upload_filename = f"{unique_id}_original.{file_ext}"
-        upload_path = os.path.join(UPLOAD_FOLDER, upload_filename)
-        file.save(upload_path)
+        # Read dimensions from the header and wait for pixel budget
+        with admit_image(file):
+            # Save uploaded file
+            upload_filename = f"{unique_id}_original.{file_ext}"
+            upload_path = os.path.join(UPLOAD_FOLDER, upload_filename)
+            with log_stage('save_upload'):
+                file.save(upload_path)
         
-        # Create display thumbnail for UI (480x720 portrait, 720x480 landscape)
-        display_filename = f"{unique_id}_display.{file_ext}"
-        display_path = os.path.join(DISPLAY_FOLDER, display_filename)
-        was_resized = create_display_thumbnail(upload_path, display_path)
+            # Create display thumbnail for UI (480x720 portrait, 720x480 landscape)
+            display_filename = f"{unique_id}_display.{file_ext}"
+            display_path = os.path.join(DISPLAY_FOLDER, display_filename)
+            with log_stage('display_thumbnail'):
+                was_resized = create_display_thumbnail(upload_path, display_path)
         
-        logger.info(f"Created display thumbnail: {display_path}, exists: {os.path.exists(display_path)}")
+            # Process the image
+            start_time = datetime.datetime.now()
         
-        # Process the image
-        logger.info(f"Starting image processing with GreyShift...")
-        start_time = datetime.datetime.now()
-        
-        try:
-            processor = GreyShift(
-                filepath=upload_path,
-                scalar=scalar
-            )
-            
-            logger.info(f"GreyShift processor initialized, calling process_with_memory_optimization()...")
-            # Process with memory optimization (resize for analysis, apply to original)
-            output_path = processor.process_with_memory_optimization(max_dimension=3280)
-            processing_time = (datetime.datetime.now() - start_time).total_seconds()
-            
-            logger.info(f"Processing completed in {processing_time:.2f}s, output: {output_path}")
+            try:
+                with log_stage('greyshift'):
+                    processor = GreyShift(
+                        filepath=upload_path,
+                        scalar=scalar,
+                        quiet=True,
+                        hooks=[greyshift_stage_hook],
+                        profile=profile,
+                        pyramid_dir=os.path.join(PYRAMID_FOLDER, unique_id) if TILE_PYRAMIDS else None,
+                        bands=bands
+                    )
+                
+                    # Process with memory optimization (resize for analysis, apply to original)
+                    output_path = processor.process_with_memory_optimization(max_dimension=3280)
+                processing_time = (datetime.datetime.now() - start_time).total_seconds()
             
-        except Exception as proc_error:
-            logger.error(f"Processing failed during GreyShift.process_with_memory_optimization(): {str(proc_error)}")
-            raise
-        
-        # Move processed file to processed folder
-        processed_filename = f"{unique_id}_processed.{file_ext}"
-        processed_path = os.path.join(PROCESSED_FOLDER, processed_filename)
-        shutil.move(output_path, processed_path)
-        
-        logger.info(f"Processed file moved to: {processed_path}, exists: {os.path.exists(processed_path)}")
-        
-        # Get image info
-        original_img = Image.open(upload_path)
-        processed_img = Image.open(processed_path)
-        
-        logger.info(f"Processing completed - File: {filename}, Time: {processing_time:.2f}s, Original: {original_img.size}, IP: {client_ip}")
-        
-        # Create display thumbnail for processed image too
-        processed_display_filename = f"{unique_id}_processed_display.{file_ext}"
-        processed_display_path = os.path.join(DISPLAY_FOLDER, processed_display_filename)
-        create_display_thumbnail(processed_path, processed_display_path)
-        
-        logger.info(f"Created processed display thumbnail: {processed_display_path}, exists: {os.path.exists(processed_display_path)}")
-        
-        # Generate absolute URLs for better compatibility
-        original_url = url_for('serve_file', folder='display', filename=display_filename, _external=False)
-        processed_url = url_for('serve_file', folder='display', filename=processed_display_filename, _external=False)
-        download_url = url_for('download_file_with_original_name',
-                              processed_filename=processed_filename,
-                              original_filename=filename,
-                              scalar=scalar,
-                              _external=False)
-        
-        logger.info(f"Generated URLs - Original: {original_url}, Processed: {processed_url}, Download: {download_url}")
-        
-        result = {
-            'success': True,
-            'original_url': original_url,
-            'processed_url': processed_url,
-            'original_size': f"{original_img.size[0]}×{original_img.size[1]}",
-            'processed_size': f"{processed_img.size[0]}×{processed_img.size[1]}",
-            'scalar': scalar,
-            'download_url': download_url
-        }
+            except Exception as proc_error:
+                log_fields(failed_stage='GreyShift.process_with_memory_optimization')
+                raise
+        
+            # Move processed file to processed folder
+            processed_filename = f"{unique_id}_processed.{file_ext}"
+            processed_path = os.path.join(PROCESSED_FOLDER, processed_filename)
+            shutil.move(output_path, processed_path)
+        
+            # Get image info
+            original_img = Image.open(upload_path)
+            processed_img = Image.open(processed_path)
+        
+            log_fields(processing_time_s=round(processing_time, 2), original_size=original_img.size)
+        
+            # Create display thumbnail for processed image too
+            processed_display_filename = f"{unique_id}_processed_display.{file_ext}"
+            processed_display_path = os.path.join(DISPLAY_FOLDER, processed_display_filename)
+            with log_stage('processed_thumbnail'):
+                create_display_thumbnail(processed_path, processed_display_path)
+        
+            # Generate absolute URLs for better compatibility
+            original_url = url_for('serve_file', folder='display', filename=display_filename, _external=False)
+            processed_url = url_for('serve_file', folder='display', filename=processed_display_filename, _external=False)
+            download_url = url_for('download_file_with_original_name',
+                                  processed_filename=processed_filename,
+                                  original_filename=filename,
+                                  scalar=scalar,
+                                  _external=False)
         
-        return jsonify(result)
+            result = {
+                'success': True,
+                'original_url': original_url,
+                'processed_url': processed_url,
+                'original_size': f"{original_img.size[0]}×{original_img.size[1]}",
+                'processed_size': f"{processed_img.size[0]}×{processed_img.size[1]}",
+                'scalar': scalar,
+                'profile': profile['name'] if profile else None,
+                'download_url': download_url
+            }
+            if TILE_PYRAMIDS:
+                result['original_dzi_url'] = url_for('serve_tile', upload_id=unique_id,
+                                                     tile_path='original.dzi')
+                result['processed_dzi_url'] = url_for('serve_tile', upload_id=unique_id,
+                                                      tile_path='processed.dzi')
         
+            return jsonify(result)
+        
+    except ImageRejected:
+        # Answered by the app-wide error handlers
+        raise
     except Exception as e:
-        logger.error(f"Processing failed - File: {file.filename if 'file' in locals() else 'Unknown'}, Error: {str(e)}, IP: {client_ip}")
+        log_fields(filename=file.filename if 'file' in locals() else 'Unknown', error=str(e))
         return jsonify({'error': f'Processing failed: {str(e)}'}), 500
 
+# Scalar sweeps: one decode and analysis, one corrected file per scalar
+SWEEP_MAX_SCALARS = int(os.environ.get('GREYSHIFT_SWEEP_MAX_SCALARS', 8))
+
+@app.route('/sweep', methods=['POST'])
+def sweep_upload():
+    """Correct one image at several scalars and return a contact sheet."""
+    try:
+        if 'file' not in request.files:
+            log_fields(error='Sweep attempt without file')
+            return jsonify({'error': 'No file selected'}), 400
+        
+        file = request.files['file']
+        if file.filename == '':
+            log_fields(error='Sweep attempt with empty filename')
+            return jsonify({'error': 'No file selected'}), 400
+        
+        if not allowed_file(file.filename):
+            log_fields(error='Invalid file type', filename=file.filename)
+            return jsonify({'error': 'Invalid file type. Please upload an image.'}), 400
+        
+        try:
+            scalars = parse_scalars(request.form.get('scalars', '0.25,0.5,0.75,1.0'))
+            if len(scalars) > SWEEP_MAX_SCALARS:
+                raise ValueError(f'At most {SWEEP_MAX_SCALARS} scalars per sweep')
+            profile = get_request_profile()
+            bands = get_request_bands(profile)
+        except (ValueError, FileNotFoundError) as e:
+            log_fields(error=str(e))
+            return jsonify({'error': str(e)}), 400
+        
+        unique_id = str(uuid.uuid4())
+        filename = secure_filename(file.filename)
+        file_ext = filename.rsplit('.', 1)[1].lower()
+        log_fields(filename=filename, scalars=scalars,
+                   profile=profile['name'] if profile else None)
+        
+        with admit_image(file):
+            upload_filename = f"{unique_id}_original.{file_ext}"
+            upload_path = os.path.join(UPLOAD_FOLDER, upload_filename)
+            with log_stage('save_upload'):
+                file.save(upload_path)
+            
+            # Write results next to the other processed files. Renders run one
+            # at a time: the stage hook needs the request context, and
+            # concurrent requests already spread across workers.
+            sweep_dir = tempfile.mkdtemp(prefix='greyshift_sweep_', dir=PROCESSED_FOLDER)
+            try:
+                with log_stage('greyshift'):
+                    processor = GreyShift(
+                        filepath=upload_path,
+                        quiet=True,
+                        hooks=[greyshift_stage_hook],
+                        profile=profile,
+                        output_dir=sweep_dir,
+                        bands=bands
+                    )
+                    sweep = processor.process_sweep(scalars, contact_sheet=True,
+                                                    max_dimension=3280)
+                
+                results = []
+                for index, (scalar, output_path) in enumerate(sweep['outputs']):
+                    processed_filename = f"{unique_id}_processed_{index}.{file_ext}"
+                    shutil.move(output_path, os.path.join(PROCESSED_FOLDER, processed_filename))
+                    results.append({
+                        'scalar': scalar,
+                        'download_url': url_for('download_file_with_original_name',
+                                                processed_filename=processed_filename,
+                                                original_filename=filename,
+                                                scalar=scalar)
+                    })
+                sheet_filename = f"{unique_id}_contact_sheet.jpg"
+                shutil.move(sweep['contact_sheet'], os.path.join(DISPLAY_FOLDER, sheet_filename))
+            finally:
+                shutil.rmtree(sweep_dir, ignore_errors=True)
+            
+            return jsonify({
+                'success': True,
+                'original_size': f"{processor.img.size[0]}×{processor.img.size[1]}",
+                'profile': profile['name'] if profile else None,
+                'contact_sheet_url': url_for('serve_file', folder='display',
+                                             filename=sheet_filename),
+                'results': results
+            })
+    
+    except ImageRejected:
+        # Answered by the app-wide error handlers
+        raise
+    except Exception as e:
+        log_fields(error=str(e))
+        return jsonify({'error': f'Sweep failed: {str(e)}'}), 500
+
 @app.route('/files/<folder>/<filename>')
 def serve_file(folder, filename):
     """Serve uploaded or processed files."""
-    client_ip = request.environ.get('HTTP_X_FORWARDED_FOR', request.remote_addr)
-    
     if folder not in ['uploads', 'processed', 'display']:
-        logger.warning(f"Invalid folder access attempt: {folder} - IP: {client_ip}")
+        log_fields(error='Invalid folder access attempt')
         return "Invalid folder", 404
     
     file_path = os.path.join(folder, filename)
     if not os.path.exists(file_path):
-        logger.warning(f"File not found: {folder}/{filename} - IP: {client_ip}")
+        log_fields(error='File not found')
         return "File not found", 404
     
-    logger.info(f"File served: {folder}/{filename} - IP: {client_ip}")
     return send_file(file_path)
 
+@app.route('/tiles/<upload_id>/<path:tile_path>')
+def serve_tile(upload_id, tile_path):
+    """Serve DeepZoom descriptors and tiles with long-lived caching."""
+    if not UPLOAD_ID_PATTERN.match(upload_id) or not TILE_PATH_PATTERN.match(tile_path):
+        log_fields(error='Invalid tile path')
+        return "File not found", 404
+    
+    file_path = os.path.join(PYRAMID_FOLDER, upload_id, tile_path)
+    if not os.path.exists(file_path):
+        log_fields(error='Tile not found')
+        return "File not found", 404
+    
+    mimetype = 'application/xml' if tile_path.endswith('.dzi') else 'image/jpeg'
+    response = send_file(file_path, mimetype=mimetype, max_age=TILE_CACHE_SECONDS)
+    response.cache_control.public = True
+    response.cache_control.immutable = True
+    return response
+
 @app.route('/download/<processed_filename>/<original_filename>')
 def download_file_with_original_name(processed_filename, original_filename):
     """Download processed file with original filename + _greyshift_scalar()."""
-    client_ip = request.environ.get('HTTP_X_FORWARDED_FOR', request.remote_addr)
-    
     file_path = os.path.join(PROCESSED_FOLDER, processed_filename)
     if not os.path.exists(file_path):
-        logger.warning(f"Download attempt for missing file: {processed_filename} - IP: {client_ip}")
+        log_fields(error='Download attempt for missing file')
         return "File not found", 404
     
     # Get scalar value from query parameters
     scalar = request.args.get('scalar', '1.0')
     
-    # Create the new filename: original name + _greyshift_scalar(value) + extension
-    name_parts = original_filename.rsplit('.', 1)
-    if len(name_parts) == 2:
-        new_filename = f"{name_parts[0]}_greyshift_scalar({scalar}).{name_parts[1]}"
-    else:
-        new_filename = f"{original_filename}_greyshift_scalar({scalar})"
+    new_filename = greyshift_download_name(original_filename, scalar)
     
-    logger.info(f"File downloaded: {processed_filename} as {new_filename} - IP: {client_ip}")
+    log_fields(download_name=new_filename)
     return send_file(file_path, as_attachment=True, download_name=new_filename)
 
 
 @app.route('/download/<filename>')
 def download_file(filename):
     """Legacy download route - for backward compatibility."""
-    client_ip = request.environ.get('HTTP_X_FORWARDED_FOR', request.remote_addr)
-    
     file_path = os.path.join(PROCESSED_FOLDER, filename)
     if not os.path.exists(file_path):
-        logger.warning(f"Download attempt for missing file: {filename} - IP: {client_ip}")
+        log_fields(error='Download attempt for missing file')
         return "File not found", 404
     
-    logger.info(f"File downloaded: {filename} - IP: {client_ip}")
     return send_file(file_path, as_attachment=True, 
                      download_name=f"greyshift_{filename}")
 
 @app.route('/analyze', methods=['POST'])
 def analyze_image():
     """Analyze image and return correction offsets for accurate preview."""
-    client_ip = request.environ.get('HTTP_X_FORWARDED_FOR', request.remote_addr)
-    
     try:
         # Check if file was uploaded
         if 'file' not in request.files:
-            logger.warning(f"Analysis attempt without file - IP: {client_ip}")
+            log_fields(error='Analysis attempt without file')
             return jsonify({'success': False, 'error': 'No file selected'}), 400
         
         file = request.files['file']
         if file.filename == '':
-            logger.warning(f"Analysis attempt with empty filename - IP: {client_ip}")
+            log_fields(error='Analysis attempt with empty filename')
             return jsonify({'success': False, 'error': 'No file selected'}), 400
         
         if not allowed_file(file.filename):
-            logger.warning(f"Invalid file type for analysis: {file.filename} - IP: {client_ip}")
+            log_fields(error='Invalid file type', filename=file.filename)
             return jsonify({'success': False, 'error': 'Invalid file type'}), 400
         
-        logger.info(f"Image analysis started - File: {file.filename} - IP: {client_ip}")
+        try:
+            bands = get_request_bands()
+        except ValueError as e:
+            log_fields(error=str(e))
+            return jsonify({'success': False, 'error': str(e)}), 400
+        
+        log_fields(filename=file.filename)
         
-        # Save temporary file
-        temp_filename = f"temp_analyze_{uuid.uuid4()}.jpg"
-        temp_path = os.path.join(UPLOAD_FOLDER, temp_filename)
-        file.save(temp_path)
+        # Read dimensions from the header and wait for pixel budget
+        with admit_image(file):
+            # Save temporary file
+            temp_filename = f"temp_analyze_{uuid.uuid4()}.jpg"
+            temp_path = os.path.join(UPLOAD_FOLDER, temp_filename)
+            with log_stage('save_upload'):
+                file.save(temp_path)
         
-        try:
-            # Analyze the image to get correction offsets (resize if needed for memory)
-            processor = GreyShift(filepath=temp_path, scalar=1.0)
-            
-            # Load and check size
-            original_img = Image.open(temp_path)
-            if original_img.mode != 'RGB':
-                original_img = original_img.convert('RGB')
-            
-            original_width, original_height = original_img.size
-            max_dimension = max(original_width, original_height)
-            
-            if max_dimension > 3280:
-                # Resize for analysis
-                scale_factor = 3280 / max_dimension
-                analysis_width = int(original_width * scale_factor)
-                analysis_height = int(original_height * scale_factor)
-                processor.img = original_img.resize((analysis_width, analysis_height), Image.Resampling.LANCZOS)
-            else:
-                processor.img = original_img
-            
-            processor.analyze_tonal_ranges()
-            
-            logger.info(f"Image analysis completed - File: {file.filename}, Offsets: R:{processor.red_avg_offset:.2f}, G:{processor.green_avg_offset:.2f}, B:{processor.blue_avg_offset:.2f} - IP: {client_ip}")
+            try:
+                # Analyze the image to get correction offsets (resize if needed for memory)
+                processor = analyze_saved_image(temp_path, bands)
             
-            # Return the calculated offsets (convert numpy types to Python floats for JSON)
-            result = {
-                'red_avg_offset': float(processor.red_avg_offset),
-                'green_avg_offset': float(processor.green_avg_offset),
-                'blue_avg_offset': float(processor.blue_avg_offset),
-                'success': True
-            }
+                # Return the calculated offsets (convert numpy types to Python floats for JSON)
+                result = {
+                    'red_avg_offset': float(processor.red_avg_offset),
+                    'green_avg_offset': float(processor.green_avg_offset),
+                    'blue_avg_offset': float(processor.blue_avg_offset),
+                    'success': True
+                }
+                log_fields(offsets=[round(result['red_avg_offset'], 2),
+                                    round(result['green_avg_offset'], 2),
+                                    round(result['blue_avg_offset'], 2)])
             
-            return jsonify(result), 200
+                return jsonify(result), 200
             
-        finally:
-            # Clean up temporary file
+            finally:
+                # Clean up temporary file
+                try:
+                    if os.path.exists(temp_path):
+                        os.remove(temp_path)
+                except Exception as cleanup_error:
+                    logger.warning("Failed to cleanup temp file",
+                                   extra={'fields': {'path': temp_path, 'error': str(cleanup_error)}})
+                
+    except ImageRejected:
+        # Answered by the app-wide error handlers
+        raise
+    except Exception as e:
+        log_fields(filename=file.filename if 'file' in locals() else 'Unknown', error=str(e))
+        return jsonify({'success': False, 'error': f'Analysis failed: {str(e)}'}), 500
+
+
+@app.route('/profiles', methods=['GET'])
+def list_profiles():
+    """List the saved correction profiles."""
+    profiles = []
+    for path in sorted(Path(PROFILE_DIR).glob('*.json')):
+        try:
+            profile = load_profile(str(path))
+        except (ValueError, OSError):
+            continue
+        profiles.append({
+            'name': path.stem,
+            'source': profile.get('source'),
+            'created': profile.get('created'),
+            'average_offsets': profile['average_offsets'],
+        })
+    return jsonify({'profiles': profiles})
+
+
+def profile_exists_response(name):
+    """Build the 409 response for a profile name that is already taken."""
+    return jsonify({'error': f"Profile '{name}' already exists; "
+                             "send overwrite=true to replace it"}), 409
+
+
+@app.route('/profiles', methods=['POST'])
+def create_profile():
+    """Analyze a reference image (e.g. a grey card) and save it as a profile.
+
+    An existing profile is only replaced when the form sends overwrite=true,
+    since batches corrected with it would otherwise silently change.
+    """
+    try:
+        name = request.form.get('name', '').strip()
+        if not PROFILE_NAME_PATTERN.match(name):
+            log_fields(error='Invalid profile name')
+            return jsonify({'error': 'Profile names may only contain letters, digits, - and _'}), 400
+        
+        overwrite = request.form.get('overwrite', '').strip().lower() in ('1', 'true', 'yes')
+        if not overwrite and resolve_profile_path(name).exists():
+            log_fields(error='Profile exists', profile=name)
+            return profile_exists_response(name)
+        
+        if 'file' not in request.files or request.files['file'].filename == '':
+            log_fields(error='Profile attempt without file')
+            return jsonify({'error': 'No file selected'}), 400
+        
+        file = request.files['file']
+        if not allowed_file(file.filename):
+            log_fields(error='Invalid file type', filename=file.filename)
+            return jsonify({'error': 'Invalid file type'}), 400
+        
+        try:
+            bands = get_request_bands()
+        except ValueError as e:
+            log_fields(error=str(e))
+            return jsonify({'error': str(e)}), 400
+        
+        log_fields(filename=file.filename, profile=name)
+        
+        with admit_image(file):
+            temp_path = os.path.join(UPLOAD_FOLDER, f"temp_profile_{uuid.uuid4()}_{secure_filename(file.filename)}")
+            with log_stage('save_upload'):
+                file.save(temp_path)
             try:
+                processor = analyze_saved_image(temp_path, bands)
+                processor.save_profile(name, source=secure_filename(file.filename),
+                                       overwrite=overwrite)
+                profile = load_profile(name)
+            finally:
                 if os.path.exists(temp_path):
                     os.remove(temp_path)
-            except Exception as cleanup_error:
-                logger.warning(f"Failed to cleanup temp file: {cleanup_error}")
-                
+        
+        return jsonify({'success': True, 'profile': profile}), 201
+    
+    except ImageRejected:
+        # Answered by the app-wide error handlers
+        raise
+    except FileExistsError:
+        # Created by another request while this one was analyzing
+        log_fields(error='Profile exists', profile=name)
+        return profile_exists_response(name)
     except Exception as e:
-        logger.error(f"Analysis failed - File: {file.filename if 'file' in locals() else 'Unknown'}, Error: {str(e)} - IP: {client_ip}")
-        return jsonify({'success': False, 'error': f'Analysis failed: {str(e)}'}), 500
+        log_fields(error=str(e))
+        return jsonify({'error': f'Profile creation failed: {str(e)}'}), 500
+
+
+@app.route('/batch', methods=['POST'])
+def batch_upload():
+    """Correct many images, or one ZIP of images, and stream back a ZIP."""
+    batch_dir = tempfile.mkdtemp(prefix='greyshift_batch_')
+    try:
+        scalar = float(request.form.get('scalar', 1.0))
+        if scalar <= 0 or scalar > 1:
+            shutil.rmtree(batch_dir, ignore_errors=True)
+            return jsonify({'error': 'Scalar must be between 0 and 1'}), 400
+        
+        profile = get_request_profile()
+        bands = get_request_bands(profile)
+        
+        # Request files are closed before the response streams, so save them now
+        with log_stage('save_uploads'):
+            inputs = save_batch_inputs(batch_dir)
+        if not inputs:
+            shutil.rmtree(batch_dir, ignore_errors=True)
+            log_fields(error='Batch upload without images')
+            return jsonify({'error': 'No images found in upload'}), 400
+        
+        log_fields(files=len(inputs), scalar=scalar)
+        
+    except Exception as e:
+        shutil.rmtree(batch_dir, ignore_errors=True)
+        log_fields(error=str(e))
+        return jsonify({'error': f'Batch failed: {str(e)}'}), 400
+    
+    return Response(stream_batch_zip(inputs, scalar, batch_dir, profile, bands),
+                    mimetype='application/zip',
+                    headers={'Content-Disposition':
+                             f'attachment; filename=greyshift_scalar({scalar}).zip'})
 
 
 @app.route('/health')
 def health_check():
     """Health check endpoint for Docker."""
-    client_ip = request.environ.get('HTTP_X_FORWARDED_FOR', request.remote_addr)
-    logger.debug(f"Health check - IP: {client_ip}")
     return jsonify({'status': 'healthy'})
 
 
 if __name__ == '__main__':
     logger.info("Starting greyShift Flask application in standalone mode")
-    app.run(debug=False, host='0.0.0.0', port=5000)
\ No newline at end of file
+    app.run(debug=False, host='0.0.0.0', port=5000)
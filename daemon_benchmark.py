@@ -0,0 +1,94 @@
+#!/usr/bin/env python3
+"""
+Per-file latency comparison: cold greyshift.py runs versus the warm daemon.
+Starts a temporary daemon, runs the same small image through both paths and
+reports the latency seen by the calling shell.
+"""
+
+import os
+import statistics
+import subprocess
+import sys
+import tempfile
+import time
+from greyshift_client import connect, send_request
+from performance_test import create_test_image
+
+RUNS = 10
+HERE = os.path.dirname(os.path.abspath(__file__))
+
+
+def time_command(command, env):
+    """Run a command RUNS times and return the per-run latencies in seconds."""
+    latencies = []
+    for _ in range(RUNS):
+        start_time = time.perf_counter()
+        subprocess.run(command, env=env, check=True, stdout=subprocess.DEVNULL)
+        latencies.append(time.perf_counter() - start_time)
+    return latencies
+
+
+def wait_for_daemon(socket_path, timeout=30):
+    """Poll the daemon socket until it answers a ping."""
+    deadline = time.time() + timeout
+    while time.time() < deadline:
+        try:
+            if send_request(connect(socket_path), {'ping': True})['ok']:
+                return
+        except OSError:
+            time.sleep(0.1)
+    raise RuntimeError("greyshift daemon did not start")
+
+
+def print_latencies(name, latencies):
+    """Print summary statistics for one mode."""
+    print(f"{name}:")
+    print(f"  Mean:   {statistics.mean(latencies) * 1000:.1f} ms")
+    print(f"  Median: {statistics.median(latencies) * 1000:.1f} ms")
+    print(f"  Min:    {min(latencies) * 1000:.1f} ms")
+    print()
+
+
+def main():
+    """Run the cold versus daemon benchmark."""
+    print("greyShift Daemon Latency Test")
+    print("=" * 50)
+    
+    with tempfile.TemporaryDirectory() as work_dir:
+        image_path = os.path.join(work_dir, 'small.jpg')
+        create_test_image(400, 300).save(image_path, 'JPEG', quality=95)
+        socket_path = os.path.join(work_dir, 'greyshift.sock')
+        env = dict(os.environ, GREYSHIFT_SOCKET=socket_path)
+        cli_args = ['--filepath', image_path, '--scalar', '0.8', '--quiet']
+        
+        print(f"\nCold mode: {RUNS} runs of greyshift.py...")
+        cold = time_command(
+            [sys.executable, os.path.join(HERE, 'greyshift.py')] + cli_args, env
+        )
+        
+        print(f"Daemon mode: {RUNS} runs of greyshift_client.py...")
+        daemon = subprocess.Popen(
+            [sys.executable, os.path.join(HERE, 'greyshift.py'), 'serve',
+             '--socket', socket_path, '--workers', '1'],
+            stdout=subprocess.DEVNULL
+        )
+        try:
+            wait_for_daemon(socket_path)
+            warm = time_command(
+                [sys.executable, os.path.join(HERE, 'greyshift_client.py')] + cli_args,
+                env
+            )
+        finally:
+            daemon.terminate()
+            daemon.wait()
+    
+    print("\n" + "=" * 50)
+    print("LATENCY SUMMARY (400x300 JPEG, per file)")
+    print("=" * 50)
+    print_latencies("Cold (python greyshift.py)", cold)
+    print_latencies("Daemon (python greyshift_client.py)", warm)
+    print(f"Speedup: {statistics.median(cold) / statistics.median(warm):.1f}x (median)")
+
+
+if __name__ == "__main__":
+    main()
@@ -1,37 +1,170 @@
-from flask import Flask, request, jsonify
-from PIL import Image
+import json
+from flask import Flask, Response, request, jsonify
+from werkzeug.utils import secure_filename
+from zip_stream import ChunkWriter, open_stored_zip
+from PIL import Image, UnidentifiedImageError
 from io import BytesIO
 
 app = Flask(__name__)
 
+# Output formats selectable with ?format=; the value is the Pillow format name
+OUTPUT_FORMATS = {
+    'png': 'PNG',
+    'jpeg': 'JPEG',
+    'jpg': 'JPEG',
+    'webp': 'WEBP',
+    'bmp': 'BMP',
+    'tiff': 'TIFF',
+}
+# Favour speed over size by default; clients can ask for more compression
+DEFAULT_PNG_COMPRESS_LEVEL = 1
+DEFAULT_QUALITY = 90
+CHUNK_SIZE = 64 * 1024
+
 
 def flip_image_vertical(image):
     return image.transpose(Image.FLIP_TOP_BOTTOM)
 
 
+def get_output_options(values=None):
+    """Read format, compress_level and quality from the query string or form.
+
+    Returns the output extension, the Pillow format name and save() options.
+    """
+    if values is None:
+        values = request.values
+    extension = values.get('format', 'png').lower()
+    if extension not in OUTPUT_FORMATS:
+        raise ValueError(f'Unsupported format: {extension}')
+    image_format = OUTPUT_FORMATS[extension]
+
+    options = {}
+    if image_format == 'PNG':
+        options['compress_level'] = int(
+            values.get('compress_level', DEFAULT_PNG_COMPRESS_LEVEL)
+        )
+        if not 0 <= options['compress_level'] <= 9:
+            raise ValueError('compress_level must be between 0 and 9')
+    elif image_format in ('JPEG', 'WEBP'):
+        options['quality'] = int(values.get('quality', DEFAULT_QUALITY))
+        if not 1 <= options['quality'] <= 100:
+            raise ValueError('quality must be between 1 and 100')
+    return extension, image_format, options
+
+
+def encode_image(image, image_format, options):
+    """Encode an image into an in-memory buffer positioned at the start."""
+    if image_format == 'JPEG' and image.mode not in ('RGB', 'L', 'CMYK'):
+        image = image.convert('RGB')
+    output_buffer = BytesIO()
+    image.save(output_buffer, format=image_format, **options)
+    output_buffer.seek(0)
+    return output_buffer
+
+
+def iter_buffer(buffer):
+    """Yield a buffer's contents in CHUNK_SIZE pieces."""
+    while True:
+        chunk = buffer.read(CHUNK_SIZE)
+        if not chunk:
+            break
+        yield chunk
+
+
 @app.route('/flip-vertical', methods=['POST'])
 def flip_vertical():
-    if 'file' not in request.files:
-        return jsonify({'error': 'No file part'})
+    """Flip one image and stream it back as raw image bytes.
+
+    The image is either a multipart 'file' field or the raw request body.
+    """
+    if request.mimetype == 'multipart/form-data':
+        if 'file' not in request.files:
+            return jsonify({'error': 'No file part'}), 400
+        file = request.files['file']
+        if file.filename == '':
+            return jsonify({'error': 'No selected file'}), 400
+        source = file.stream
+        values = request.values
+    else:
+        # Read the body before anything parses it as a form (curl
+        # --data-binary sends application/x-www-form-urlencoded), and take
+        # options from the query string only
+        source = BytesIO(request.get_data())
+        if not source.getbuffer().nbytes:
+            return jsonify({'error': 'No file part'}), 400
+        values = request.args
+
+    try:
+        extension, image_format, options = get_output_options(values)
+    except ValueError as e:
+        return jsonify({'error': str(e)}), 400
+
+    try:
+        img = Image.open(source)
+        flipped_img = flip_image_vertical(img)
+        output_buffer = encode_image(flipped_img, image_format, options)
+    except UnidentifiedImageError:
+        return jsonify({'error': 'Not a readable image'}), 400
+    except Exception as e:
+        return jsonify({'error': str(e)}), 400
+
+    response = Response(iter_buffer(output_buffer),
+                        mimetype=Image.MIME[image_format])
+    response.content_length = output_buffer.getbuffer().nbytes
+    return response
+
+
+@app.route('/flip-vertical/batch', methods=['POST'])
+def flip_vertical_batch():
+    """Flip every uploaded 'files' entry and stream the results as a ZIP.
+
+    Each image is written to the archive as soon as it is flipped. Files that
+    fail are listed in an errors.json entry at the end of the archive.
+    """
+    # Read the uploads now; request files are closed before the stream runs
+    files = [(file.filename, file.read())
+             for file in request.files.getlist('files') if file.filename]
+    if not files:
+        return jsonify({'error': 'No files part'}), 400
 
-    file = request.files['file']
+    try:
+        extension, image_format, options = get_output_options()
+    except ValueError as e:
+        return jsonify({'error': str(e)}), 400
 
-    if file.filename == '':
-        return jsonify({'error': 'No selected file'})
+    def generate():
+        writer = ChunkWriter()
+        errors = []
+        with open_stored_zip(writer) as archive:
+            for index, (filename, data) in enumerate(files):
+                # Client names may contain path components; never use them raw
+                stem = secure_filename(filename).rsplit('.', 1)[0] or 'image'
+                try:
+                    img = Image.open(BytesIO(data))
+                    output_buffer = encode_image(
+                        flip_image_vertical(img), image_format, options
+                    )
+                except UnidentifiedImageError:
+                    errors.append({'index': index, 'file': filename,
+                                   'error': 'Not a readable image'})
+                    continue
+                except Exception as e:
+                    errors.append({'index': index, 'file': filename,
+                                   'error': str(e)})
+                    continue
+                archive.writestr(f'{index:04d}_{stem}.{extension}',
+                                 output_buffer.getvalue())
+                yield writer.drain()
+            if errors:
+                archive.writestr('errors.json', json.dumps(errors, indent=2))
+        yield writer.drain()
 
-    if file:
-        try:
-            img = Image.open(file)
-            flipped_img = flip_image_vertical(img)
-            output_buffer = BytesIO()
-            flipped_img.save(output_buffer, format='PNG')
-            output_buffer.seek(0)
-            return jsonify(
-                {'flipped_image': output_buffer.getvalue().decode('latin1')}
-            )
-        except Exception as e:
-            return jsonify({'error': str(e)})
+    return Response(generate(),
+                    mimetype='application/zip',
+                    headers={'Content-Disposition':
+                             'attachment; filename=flipped.zip'})
 
 
 if __name__ == '__main__':
-    app.run(debug=True)
+    # app.py serves on 5000, so the flip service takes the next port
+    app.run(debug=True, port=5001)
@@ -9,15 +9,291 @@ This is a Python conversion of the original Processing (greyShift.pde) sketch.
 import argparse
 import sys
 import os
-from PIL import Image
+import io
+import math
+import time
+import json
+import datetime
+import re
+import threading
+from concurrent.futures import ThreadPoolExecutor
+from contextlib import contextmanager
+from PIL import Image, ImageDraw
 import numpy as np
 from pathlib import Path
 
 
+STAGES = ('open', 'resize', 'analyze', 'correct', 'encode', 'save', 'pyramid')
+
+# DeepZoom tile pyramids for zoomable viewing
+TILE_SIZE = 256
+TILE_FORMAT = 'jpg'
+TILE_QUALITY = 85
+
+# Scalar sweeps: contact sheet cell size and columns
+CONTACT_SHEET_THUMBNAIL = 360
+CONTACT_SHEET_COLUMNS = 4
+CONTACT_SHEET_LABEL_HEIGHT = 24
+
+# Correction profiles saved by name are looked up in this directory
+PROFILE_DIR = os.environ.get('GREYSHIFT_PROFILE_DIR', 'profiles')
+PROFILE_VERSION = 1
+
+# Tonal bands: pixels whose average brightness falls within edges (inclusive)
+# are compared against target; band offsets are averaged using weight
+DEFAULT_BANDS = (
+    {'name': 'low', 'edges': (54, 74), 'target': 64, 'weight': 1.0},
+    {'name': 'mid', 'edges': (119, 139), 'target': 129, 'weight': 1.0},
+    {'name': 'high', 'edges': (183, 203), 'target': 193, 'weight': 1.0},
+)
+# "[name=]LOW-HIGH[:TARGET][*WEIGHT]", e.g. "shadows=40-80:60*2"
+BAND_SPEC_PATTERN = re.compile(
+    r'^(?:(?P<name>[A-Za-z0-9_-]+)=)?(?P<low>\d+(?:\.\d+)?)-(?P<high>\d+(?:\.\d+)?)'
+    r'(?::(?P<target>\d+(?:\.\d+)?))?(?:\*(?P<weight>\d+(?:\.\d+)?))?$'
+)
+# Brightness bins: the per-pixel channel sum r+g+b, 0..765
+BRIGHTNESS_BINS = 766
+
+
+def resolve_profile_path(profile):
+    """Map a profile name to PROFILE_DIR/<name>.json; paths are returned as is."""
+    if profile.endswith('.json') or os.sep in profile or '/' in profile:
+        return Path(profile)
+    return Path(PROFILE_DIR) / f"{profile}.json"
+
+
+def load_profile(profile):
+    """Load and validate a correction profile from a name or JSON path."""
+    path = resolve_profile_path(profile)
+    if not path.exists():
+        raise FileNotFoundError(f"Correction profile not found: {path}")
+    with open(path) as profile_file:
+        data = json.load(profile_file)
+    
+    if data.get('version') != PROFILE_VERSION:
+        raise ValueError(f"Unsupported correction profile version in {path}")
+    bands = data.get('bands', [])
+    if not bands:
+        raise ValueError(f"Correction profile {path} has no bands")
+    for band in bands:
+        if len(band.get('offsets', [])) != 3:
+            raise ValueError(f"Correction profile {path} is missing offsets "
+                             f"for the {band.get('name')} band")
+    if len(data.get('average_offsets', [])) != 3:
+        raise ValueError(f"Correction profile {path} is missing average offsets")
+    return data
+
+
+class TimingSummary:
+    """Instrumentation hook that aggregates stage timings across a run.
+
+    Register an instance with ``GreyShift(hooks=[...])`` or
+    ``GreyShift.add_hook()``; call ``report()`` afterwards for a table.
+    """
+
+    def __init__(self):
+        self.stages = {}
+
+    def __call__(self, event):
+        """Record a stage end event."""
+        if event['phase'] != 'end':
+            return
+        totals = self.stages.setdefault(event['stage'], {
+            'calls': 0,
+            'errors': 0,
+            'wall_time': 0.0,
+            'cpu_time': 0.0,
+            'array_bytes': 0,
+            'pixels': 0,
+        })
+        totals['calls'] += 1
+        totals['errors'] += event.get('error', False)
+        totals['wall_time'] += event['wall_time']
+        totals['cpu_time'] += event['cpu_time']
+        totals['array_bytes'] += event['array_bytes']
+        totals['pixels'] += event['pixels']
+
+    def total_wall_time(self):
+        """Return the summed wall time of all recorded stages in seconds."""
+        return sum(totals['wall_time'] for totals in self.stages.values())
+
+    def report(self):
+        """Return the per-stage summary as a printable table."""
+        lines = [
+            f"{'Stage':<10}{'Calls':>6}{'Wall (s)':>11}{'CPU (s)':>10}"
+            f"{'Arrays (MB)':>13}{'Pixels':>14}",
+            "-" * 64,
+        ]
+        for stage, totals in self.stages.items():
+            lines.append(
+                f"{stage:<10}{totals['calls']:>6}{totals['wall_time']:>11.3f}"
+                f"{totals['cpu_time']:>10.3f}"
+                f"{totals['array_bytes'] / (1024 * 1024):>13.1f}"
+                f"{totals['pixels']:>14,}"
+            )
+        lines.append("-" * 64)
+        lines.append(f"{'Total':<10}{'':>6}{self.total_wall_time():>11.3f}")
+        return "\n".join(lines)
+
+
+def write_deepzoom_pyramid(image, output_dir, name, tile_size=TILE_SIZE,
+                           tile_format=TILE_FORMAT, quality=TILE_QUALITY):
+    """Write a DeepZoom tile pyramid (<name>.dzi and <name>_files/) for an image.
+    
+    Levels are produced top-down in one pass over the already-decoded image:
+    each level is cut into tiles and then halved to make the next level, so
+    the source file is never decoded again.
+    
+    Returns:
+        tuple: (path to the .dzi descriptor, number of tiles written)
+    """
+    output_dir = Path(output_dir)
+    tiles_dir = output_dir / f"{name}_files"
+    width, height = image.size
+    max_level = math.ceil(math.log2(max(width, height, 1)))
+    
+    level_image = image if image.mode == 'RGB' else image.convert('RGB')
+    tile_count = 0
+    for level in range(max_level, -1, -1):
+        level_dir = tiles_dir / str(level)
+        level_dir.mkdir(parents=True, exist_ok=True)
+        level_width, level_height = level_image.size
+        for column in range(math.ceil(level_width / tile_size)):
+            for row in range(math.ceil(level_height / tile_size)):
+                box = (column * tile_size, row * tile_size,
+                       min((column + 1) * tile_size, level_width),
+                       min((row + 1) * tile_size, level_height))
+                level_image.crop(box).save(
+                    level_dir / f"{column}_{row}.{tile_format}", quality=quality
+                )
+                tile_count += 1
+        if level > 0:
+            # Box-filter halving; sizes round up, matching DeepZoom level sizes
+            level_image = level_image.reduce(2)
+    
+    dzi_path = output_dir / f"{name}.dzi"
+    dzi_path.write_text(
+        '<?xml version="1.0" encoding="UTF-8"?>\n'
+        '<Image xmlns="http://schemas.microsoft.com/deepzoom/2008" '
+        f'Format="{tile_format}" Overlap="0" TileSize="{tile_size}">'
+        f'<Size Width="{width}" Height="{height}"/></Image>\n'
+    )
+    return str(dzi_path), tile_count
+
+
+def parse_scalars(scalars):
+    """Parse a sweep's correction intensities from "0.25,0.5" or a list.
+    
+    Duplicates are dropped, keeping the first occurrence.
+    
+    Returns:
+        list: Scalars as floats, in the order given
+    """
+    if isinstance(scalars, str):
+        scalars = [value for value in scalars.split(',') if value.strip()]
+    parsed = []
+    for value in scalars:
+        try:
+            scalar = float(value)
+        except (TypeError, ValueError):
+            raise ValueError(f"Invalid scalar: {value!r}")
+        if scalar <= 0 or scalar > 1:
+            raise ValueError("Scalar must be greater than 0 and less than or equal to 1")
+        if scalar not in parsed:
+            parsed.append(scalar)
+    if not parsed:
+        raise ValueError("At least one scalar is required")
+    return parsed
+
+
+def parse_bands(bands):
+    """Parse a tonal band layout from a spec string, JSON or a list.
+    
+    Strings are comma-separated "[name=]LOW-HIGH[:TARGET][*WEIGHT]" bands,
+    e.g. "54-74:64,119-139:129,183-203:193", or a JSON list. List items are
+    spec strings or dicts with 'edges', and optionally 'name', 'target' and
+    'weight'. The target defaults to the middle of the band, the weight to 1.
+    
+    Returns:
+        list: Band dicts with 'name', 'edges', 'target' and 'weight'
+    """
+    if isinstance(bands, str):
+        bands = bands.strip()
+        if bands.startswith('['):
+            try:
+                bands = json.loads(bands)
+            except json.JSONDecodeError as e:
+                raise ValueError(f"Invalid band list: {e}")
+        else:
+            bands = [band.strip() for band in bands.split(',') if band.strip()]
+    
+    parsed = []
+    for index, band in enumerate(bands, start=1):
+        if isinstance(band, str):
+            match = BAND_SPEC_PATTERN.match(band.replace(' ', ''))
+            if not match:
+                raise ValueError(f"Invalid band {band!r}, expected "
+                                 f"[name=]LOW-HIGH[:TARGET][*WEIGHT]")
+            band = {
+                'name': match['name'],
+                'edges': (float(match['low']), float(match['high'])),
+                'target': match['target'] and float(match['target']),
+                'weight': match['weight'] and float(match['weight']),
+            }
+        try:
+            low, high = (float(edge) for edge in band['edges'])
+            target = band.get('target')
+            target = (low + high) / 2 if target is None else float(target)
+            weight = band.get('weight')
+            weight = 1.0 if weight is None else float(weight)
+        except (KeyError, TypeError, ValueError, AttributeError):
+            raise ValueError(f"Invalid band {band!r}")
+        if not 0 <= low <= high <= 255:
+            raise ValueError(f"Band edges must satisfy 0 <= low <= high <= 255, got {low}-{high}")
+        if not 0 <= target <= 255:
+            raise ValueError(f"Band target must be between 0 and 255, got {target}")
+        if weight <= 0:
+            raise ValueError(f"Band weight must be greater than 0, got {weight}")
+        parsed.append({
+            'name': band.get('name') or f"band{index}",
+            'edges': (low, high),
+            'target': target,
+            'weight': weight,
+        })
+    if not parsed:
+        raise ValueError("At least one band is required")
+    return parsed
+
+
+def make_contact_sheet(cells, thumbnail=CONTACT_SHEET_THUMBNAIL,
+                       columns=CONTACT_SHEET_COLUMNS):
+    """Lay out (label, image) cells in a labelled grid.
+    
+    Images are expected to already fit in a thumbnail x thumbnail box.
+    
+    Returns:
+        PIL.Image: The contact sheet
+    """
+    columns = max(1, min(columns, len(cells)))
+    rows = math.ceil(len(cells) / columns)
+    cell_height = thumbnail + CONTACT_SHEET_LABEL_HEIGHT
+    sheet = Image.new('RGB', (columns * thumbnail, rows * cell_height), 'white')
+    draw = ImageDraw.Draw(sheet)
+    for index, (label, image) in enumerate(cells):
+        left = (index % columns) * thumbnail
+        top = (index // columns) * cell_height
+        sheet.paste(image, (left + (thumbnail - image.size[0]) // 2,
+                            top + (thumbnail - image.size[1]) // 2))
+        draw.text((left + 6, top + thumbnail + 6), label, fill='black')
+    return sheet
+
+
 class GreyShift:
     """Main class for performing greyShift color correction on images."""
     
-    def __init__(self, filepath, width=None, height=None, scalar=1.0):
+    def __init__(self, filepath, width=None, height=None, scalar=1.0,
+                 quiet=False, hooks=None, profile=None, output_dir=None,
+                 pyramid_dir=None, bands=None):
         """
         Initialize the greyShift processor.
         
@@ -26,41 +302,44 @@ class GreyShift:
             width (int): Target width for processing (optional)
             height (int): Target height for processing (optional)
             scalar (float): Correction intensity (0.0 to 1.0)
+            quiet (bool): Suppress progress output on stdout
+            hooks (list): Callables receiving stage start/end events (optional)
+            profile (str or dict): Correction profile name, path or loaded
+                profile; when given, tonal analysis is skipped (optional)
+            output_dir (str): Directory for the corrected image (default:
+                next to the input)
+            pyramid_dir (str): Also write DeepZoom tile pyramids of the
+                original and corrected image here (optional)
+            bands (str or list): Tonal band layout for analysis, see
+                parse_bands (default: DEFAULT_BANDS)
         """
         self.filepath = filepath
         self.width = width
         self.height = height
         self.scalar = scalar
+        self.quiet = quiet
+        self.hooks = list(hooks or [])
+        self.output_dir = output_dir
+        self.pyramid_dir = pyramid_dir
+        # Sweep renders can report stages from several threads
+        self._hook_lock = threading.Lock()
         
         # Validate inputs
         self._validate_inputs()
         
-        # Tonal separation variables
-        self.low_count = 0
-        self.mid_count = 0
-        self.high_count = 0
+        # Tonal bands and their per-band results: 'count' and RGB 'offsets'
+        self.bands = parse_bands(bands if bands is not None else DEFAULT_BANDS)
+        self.band_results = []
         
-        # RGB ranges for tonal analysis
-        # Low tones (25% brightness range)
-        self.r1, self.r2 = 54, 74
-        # Mid tones (50% brightness range)  
-        self.r3, self.r4 = 119, 139
-        # High tones (75% brightness range)
-        self.r5, self.r6 = 183, 203
+        # Weighted average of the band offsets, applied by the correction
+        self.red_avg_offset = 0
+        self.green_avg_offset = 0
+        self.blue_avg_offset = 0
         
-
-        # Offset calculations
-        self.red_low_offset = 0
-        self.green_low_offset = 0
-        self.blue_low_offset = 0
-        
-        self.red_mid_offset = 0
-        self.green_mid_offset = 0
-        self.blue_mid_offset = 0
-        
-        self.red_high_offset = 0
-        self.green_high_offset = 0
-        self.blue_high_offset = 0
+        # Offsets from a saved profile replace per-image analysis
+        self.profile = None
+        if profile is not None:
+            self.apply_profile(load_profile(profile) if isinstance(profile, str) else profile)
 
     def _validate_inputs(self):
         """Validate input parameters."""
@@ -73,157 +352,347 @@ class GreyShift:
         if self.scalar <= 0 or self.scalar > 1:
             raise ValueError("Scalar must be greater than 0 and less than or equal to 1")
 
+    def add_hook(self, hook):
+        """Register a callable that receives stage start/end events.
+
+        Each event is a dict with ``stage`` (one of ``STAGES``) and ``phase``
+        (``'start'`` or ``'end'``). Every start is matched by an end event, even
+        when the stage raises; end events carry ``error`` (True if the stage
+        raised), ``wall_time`` and ``cpu_time`` in seconds, ``array_bytes``
+        allocated by the stage and the number of ``pixels`` it handled.
+        """
+        self.hooks.append(hook)
+
+    def _log(self, message):
+        """Print a progress message unless running in quiet mode."""
+        if not self.quiet:
+            print(message)
+
+    @contextmanager
+    def _stage(self, stage):
+        """Time a pipeline stage and report it to the registered hooks.
+
+        Yields a dict the stage fills in with ``array_bytes`` and ``pixels``.
+        """
+        if not self.hooks:
+            yield {}
+            return
+        with self._hook_lock:
+            for hook in self.hooks:
+                hook({'stage': stage, 'phase': 'start'})
+        metrics = {'array_bytes': 0, 'pixels': 0}
+        wall_start = time.perf_counter()
+        cpu_start = time.process_time()
+        failed = True
+        try:
+            yield metrics
+            failed = False
+        finally:
+            # process_time() is process-wide, so parallel sweep stages overlap
+            event = {
+                'stage': stage,
+                'phase': 'end',
+                'error': failed,
+                'wall_time': time.perf_counter() - wall_start,
+                'cpu_time': time.process_time() - cpu_start,
+                'array_bytes': int(metrics['array_bytes']),
+                'pixels': int(metrics['pixels']),
+            }
+            with self._hook_lock:
+                for hook in self.hooks:
+                    hook(event)
+
+    def _open_image(self, convert=True):
+        """Open and decode the input image inside the 'open' stage."""
+        with self._stage('open') as metrics:
+            img = Image.open(self.filepath)
+            img.load()
+            if convert and img.mode != 'RGB':
+                img = img.convert('RGB')
+            metrics['pixels'] = img.size[0] * img.size[1]
+            metrics['array_bytes'] = metrics['pixels'] * len(img.getbands())
+        return img
+
     def load_and_resize_image(self):
         """Load the image and optionally resize it."""
         try:
-            self.img = Image.open(self.filepath)
-            print(f"Loaded image: {self.img.size[0]}x{self.img.size[1]} pixels")
+            resize = bool(self.width and self.height)
+            self.img = self._open_image(convert=not resize)
+            self._log(f"Loaded image: {self.img.size[0]}x{self.img.size[1]} pixels")
             
             # Resize if width and height are specified
-            if self.width and self.height:
-                self.img = self.img.resize((self.width, self.height), Image.Resampling.LANCZOS)
-                print(f"Resized image to: {self.width}x{self.height} pixels")
-            
-            # Convert to RGB if not already
-            if self.img.mode != 'RGB':
-                self.img = self.img.convert('RGB')
+            if resize:
+                with self._stage('resize') as metrics:
+                    self.img = self.img.resize((self.width, self.height), Image.Resampling.LANCZOS)
+                    
+                    # Convert to RGB if not already
+                    if self.img.mode != 'RGB':
+                        self.img = self.img.convert('RGB')
+                    metrics['pixels'] = self.width * self.height
+                    metrics['array_bytes'] = metrics['pixels'] * 3
+                self._log(f"Resized image to: {self.width}x{self.height} pixels")
                 
         except Exception as e:
             raise Exception(f"Error loading image: {e}")
 
     def analyze_tonal_ranges(self):
         """Analyze pixels in different tonal ranges using vectorized operations."""
-        # Convert image to numpy array for faster processing
-        img_array = np.array(self.img, dtype=np.float32)
-        
-        print("Analyzing tonal ranges...")
-        
-        # Calculate average brightness for all pixels at once (vectorized)
-        averages = np.mean(img_array, axis=2)
-        
-        # Create masks for each tonal range (vectorized boolean operations)
-        low_mask = (averages >= self.r1) & (averages <= self.r2)
-        mid_mask = (averages >= self.r3) & (averages <= self.r4)
-        high_mask = (averages >= self.r5) & (averages <= self.r6)
-        
-        # Count pixels in each range
-        self.low_count = np.sum(low_mask)
-        self.mid_count = np.sum(mid_mask)
-        self.high_count = np.sum(high_mask)
-        
-        # Calculate offsets using vectorized operations
-        if self.low_count > 0:
-            low_pixels = img_array[low_mask]
-            self.red_low_offset = np.mean(low_pixels[:, 0]) - 64
-            self.green_low_offset = np.mean(low_pixels[:, 1]) - 64
-            self.blue_low_offset = np.mean(low_pixels[:, 2]) - 64
-        else:
-            self.red_low_offset = 0
-            self.green_low_offset = 0
-            self.blue_low_offset = 0
-            
-        if self.mid_count > 0:
-            mid_pixels = img_array[mid_mask]
-            self.red_mid_offset = np.mean(mid_pixels[:, 0]) - 129
-            self.green_mid_offset = np.mean(mid_pixels[:, 1]) - 129
-            self.blue_mid_offset = np.mean(mid_pixels[:, 2]) - 129
-        else:
-            self.red_mid_offset = 0
-            self.green_mid_offset = 0
-            self.blue_mid_offset = 0
-            
-        if self.high_count > 0:
-            high_pixels = img_array[high_mask]
-            self.red_high_offset = np.mean(high_pixels[:, 0]) - 193
-            self.green_high_offset = np.mean(high_pixels[:, 1]) - 193
-            self.blue_high_offset = np.mean(high_pixels[:, 2]) - 193
-        else:
-            self.red_high_offset = 0
-            self.green_high_offset = 0
-            self.blue_high_offset = 0
-        
-        # Calculate average offsets
-        offsets = [
-            (self.red_low_offset, self.red_mid_offset, self.red_high_offset),
-            (self.green_low_offset, self.green_mid_offset,
-             self.green_high_offset),
-            (self.blue_low_offset, self.blue_mid_offset, self.blue_high_offset)
+        with self._stage('analyze') as metrics:
+            self._analyze_tonal_ranges(metrics)
+        
+        for band in self.band_results:
+            low, high = band['edges']
+            red, green, blue = band['offsets']
+            self._log(f"{band['name']} band ({low:g}-{high:g}): {band['count']} pixels, "
+                      f"offsets R={red:.2f}, G={green:.2f}, B={blue:.2f}")
+
+    def _analyze_tonal_ranges(self, metrics):
+        """Compute tonal-band offsets from self.img, filling in stage metrics.
+        
+        One pass over the pixels bins them by brightness (the channel sum
+        r+g+b) into per-bin pixel counts and channel totals. A cumulative sum
+        of that small table gives every band's totals with two lookups, so
+        the number of bands barely affects the cost.
+        """
+        self._log("Analyzing tonal ranges...")
+        
+        pixels = np.asarray(self.img).reshape(-1, 3)
+        # Column adds are much faster than sum(axis=1) over a length-3 axis
+        brightness_sums = pixels[:, 0].astype(np.uint16)
+        brightness_sums += pixels[:, 1]
+        brightness_sums += pixels[:, 2]
+        counts = np.bincount(brightness_sums, minlength=BRIGHTNESS_BINS)
+        red_totals = np.bincount(brightness_sums, weights=pixels[:, 0],
+                                 minlength=BRIGHTNESS_BINS)
+        green_totals = np.bincount(brightness_sums, weights=pixels[:, 1],
+                                   minlength=BRIGHTNESS_BINS)
+        # Every pixel in bin s has r+g+b == s, so blue needs no extra pass
+        blue_totals = np.arange(BRIGHTNESS_BINS) * counts - red_totals - green_totals
+        
+        cumulative = np.zeros((BRIGHTNESS_BINS + 1, 4))
+        cumulative[1:] = np.cumsum(
+            np.stack([counts, red_totals, green_totals, blue_totals], axis=1), axis=0
+        )
+        # Average brightness of each bin, as float32 like a per-pixel mean
+        levels = np.arange(BRIGHTNESS_BINS, dtype=np.float32) / np.float32(3)
+        
+        self.band_results = []
+        for band in self.bands:
+            low, high = band['edges']
+            first = np.searchsorted(levels, np.float32(low), side='left')
+            last = np.searchsorted(levels, np.float32(high), side='right')
+            count, red, green, blue = cumulative[last] - cumulative[first]
+            if count > 0:
+                offsets = [total / count - band['target'] for total in (red, green, blue)]
+            else:
+                offsets = [0.0, 0.0, 0.0]
+            self.band_results.append(dict(band, count=int(count), offsets=offsets))
+        
+        # Weighted average of the band offsets; bands without pixels count as 0
+        total_weight = sum(band['weight'] for band in self.band_results)
+        (self.red_avg_offset, self.green_avg_offset, self.blue_avg_offset) = (
+            sum(band['weight'] * band['offsets'][channel] for band in self.band_results)
+            / total_weight
+            for channel in range(3)
+        )
+        
+        metrics['pixels'] = brightness_sums.size
+        # uint16 sums plus the float64 weight copies bincount makes
+        metrics['array_bytes'] = brightness_sums.nbytes + 2 * brightness_sums.size * 8
+
+    def get_profile(self, name, source=None):
+        """Return the analyzed offsets as a correction profile dict."""
+        return {
+            'version': PROFILE_VERSION,
+            'name': name,
+            'source': source or os.path.basename(self.filepath),
+            'created': datetime.datetime.now().isoformat(timespec='seconds'),
+            'bands': [
+                {
+                    'name': band['name'],
+                    'edges': [float(edge) for edge in band['edges']],
+                    'target': float(band['target']),
+                    'weight': float(band['weight']),
+                    'count': int(band['count']),
+                    'offsets': [float(offset) for offset in band['offsets']],
+                }
+                for band in self.band_results
+            ],
+            'average_offsets': [float(self.red_avg_offset),
+                                float(self.green_avg_offset),
+                                float(self.blue_avg_offset)],
+        }
+
+    def save_profile(self, name, source=None, overwrite=True):
+        """Save the analyzed offsets as a correction profile.
+        
+        Args:
+            name (str): Profile name (stored in PROFILE_DIR) or JSON path
+            source (str): Reference image name to record (default: input file)
+            overwrite (bool): Replace an existing profile; if False, raise
+                FileExistsError instead
+        
+        Returns:
+            str: Path to the saved profile
+        """
+        path = resolve_profile_path(name)
+        path.parent.mkdir(parents=True, exist_ok=True)
+        with open(path, 'w' if overwrite else 'x') as profile_file:
+            json.dump(self.get_profile(path.stem, source), profile_file, indent=2)
+        self._log(f"Saved correction profile: {path}")
+        return str(path)
+
+    def apply_profile(self, profile):
+        """Use the offsets from a loaded correction profile instead of analysis."""
+        self.band_results = [
+            {
+                'name': band.get('name'),
+                'edges': tuple(band.get('edges', ())),
+                'target': band.get('target'),
+                'weight': band.get('weight', 1.0),
+                'count': band.get('count', 0),
+                'offsets': list(band['offsets']),
+            }
+            for band in profile['bands']
         ]
-        self.red_avg_offset = sum(offsets[0]) / 3
-        self.green_avg_offset = sum(offsets[1]) / 3
-        self.blue_avg_offset = sum(offsets[2]) / 3
-        
-        print(f"Low-tone pixels found: {self.low_count}")
-        print(f"Mid-tone pixels found: {self.mid_count}")
-        print(f"High-tone pixels found: {self.high_count}")
-        print(f"Low offsets: R={self.red_low_offset:.2f}, "
-              f"G={self.green_low_offset:.2f}, B={self.blue_low_offset:.2f}")
-        print(f"Mid offsets: R={self.red_mid_offset:.2f}, "
-              f"G={self.green_mid_offset:.2f}, B={self.blue_mid_offset:.2f}")
-        print(f"High offsets: R={self.red_high_offset:.2f}, "
-              f"G={self.green_high_offset:.2f}, B={self.blue_high_offset:.2f}")
+        (self.red_avg_offset, self.green_avg_offset,
+         self.blue_avg_offset) = profile['average_offsets']
+        self.profile = profile
 
     def apply_correction(self):
         """Apply the greyShift correction to all pixels."""
-        print("Applying greyShift correction...")
-        
-        # Convert image to numpy array
-        img_array = np.array(self.img)
+        self._log("Applying greyShift correction...")
         
-        # Apply corrections to each pixel using vectorized operations
-        corrected_array = img_array.astype(np.float32)
+        with self._stage('correct') as metrics:
+            # Convert image to numpy array
+            img_array = np.array(self.img)
+            
+            # Apply corrections to each pixel using vectorized operations
+            corrected_array = img_array.astype(np.float32)
+            float_bytes = corrected_array.nbytes
+            
+            # Apply offsets to each channel
+            corrected_array[:, :, 0] -= self.red_avg_offset * self.scalar
+            corrected_array[:, :, 1] -= self.green_avg_offset * self.scalar
+            corrected_array[:, :, 2] -= self.blue_avg_offset * self.scalar
+            
+            # Clamp values to valid range [0, 255]
+            corrected_array = np.clip(np.round(corrected_array), 0, 255)
+            corrected_array = corrected_array.astype(np.uint8)
+            
+            # Convert back to PIL Image
+            self.corrected_img = Image.fromarray(corrected_array)
+            
+            metrics['pixels'] = img_array.shape[0] * img_array.shape[1]
+            # uint8 input, float32 working copy, round/clip temporaries, uint8 result
+            metrics['array_bytes'] = (img_array.nbytes + 3 * float_bytes +
+                                      corrected_array.nbytes)
+
+    def correction_table(self, scalar):
+        """Return a 768-entry RGB lookup table applying the average offsets.
         
-        # Apply offsets to each channel
-        corrected_array[:, :, 0] -= self.red_avg_offset * self.scalar
-        corrected_array[:, :, 1] -= self.green_avg_offset * self.scalar
-        corrected_array[:, :, 2] -= self.blue_avg_offset * self.scalar
+        Each channel is computed as apply_correction does it (float32
+        subtraction, rounding, clamping), so table lookups give the same
+        pixels as a full correction at this scalar.
+        """
+        table = []
+        for offset in (self.red_avg_offset, self.green_avg_offset, self.blue_avg_offset):
+            levels = np.arange(256, dtype=np.float32)
+            levels -= offset * scalar
+            table.extend(np.clip(np.round(levels), 0, 255).astype(np.uint8).tolist())
+        return table
+
+    def render_scalar(self, scalar):
+        """Return self.img corrected at the given scalar without re-analyzing."""
+        with self._stage('correct') as metrics:
+            corrected_img = self.img.point(self.correction_table(scalar))
+            metrics['pixels'] = self.img.size[0] * self.img.size[1]
+            metrics['array_bytes'] = metrics['pixels'] * 3
+        return corrected_img
+
+    def save_image(self, image=None, scalar=None):
+        """Save the corrected image with a descriptive filename.
         
-        # Clamp values to valid range [0, 255]
-        corrected_array = np.clip(np.round(corrected_array), 0, 255)
-        corrected_array = corrected_array.astype(np.uint8)
+        Args:
+            image (PIL.Image): Image to save (default: self.corrected_img)
+            scalar (float): Scalar for the filename (default: self.scalar)
+        """
+        image = self.corrected_img if image is None else image
+        scalar = self.scalar if scalar is None else scalar
         
-        # Convert back to PIL Image
-        self.corrected_img = Image.fromarray(corrected_array)
-
-    def save_image(self):
-        """Save the corrected image with a descriptive filename."""
         # Parse the original filepath
         path = Path(self.filepath)
         stem = path.stem  # filename without extension
         suffix = path.suffix  # file extension
         
         # Create output filename
-        output_filename = f"{stem}_shifted_scalar({self.scalar}){suffix}"
-        output_path = path.parent / output_filename
+        output_filename = f"{stem}_shifted_scalar({scalar}){suffix}"
+        output_dir = Path(self.output_dir) if self.output_dir else path.parent
+        output_path = output_dir / output_filename
         
-        # Preserve metadata from original image
-        try:
-            original_img = Image.open(self.filepath)
-            # Copy EXIF and other metadata if it exists
-            if hasattr(original_img, 'info') and original_img.info:
-                self.corrected_img.save(output_path, **original_img.info)
-            else:
-                self.corrected_img.save(output_path)
-        except Exception as e:
-            print(f"Warning: Could not preserve metadata: {e}")
-            # Fallback to saving without metadata
-            self.corrected_img.save(output_path)
+        # Encode in memory first so encoding and disk I/O are timed separately
+        image_format = Image.registered_extensions().get(suffix.lower())
+        with self._stage('encode') as metrics:
+            buffer = io.BytesIO()
+            
+            # Preserve metadata from original image
+            try:
+                original_img = Image.open(self.filepath)
+                # Copy EXIF and other metadata if it exists
+                if hasattr(original_img, 'info') and original_img.info:
+                    image.save(buffer, format=image_format, **original_img.info)
+                else:
+                    image.save(buffer, format=image_format)
+            except Exception as e:
+                self._log(f"Warning: Could not preserve metadata: {e}")
+                # Fallback to saving without metadata
+                buffer = io.BytesIO()
+                image.save(buffer, format=image_format)
+            
+            metrics['pixels'] = image.size[0] * image.size[1]
+            metrics['array_bytes'] = buffer.tell()
+        
+        with self._stage('save') as metrics:
+            with open(output_path, 'wb') as output_file:
+                output_file.write(buffer.getbuffer())
+            metrics['pixels'] = image.size[0] * image.size[1]
         
-        print(f"Saved corrected image: {output_path}")
+        self._log(f"Saved corrected image: {output_path}")
         
         return str(output_path)
 
+    def save_pyramids(self, pyramid_dir):
+        """Write 'original' and 'processed' DeepZoom pyramids from the decoded images.
+        
+        Returns:
+            dict: Paths to the two .dzi descriptors
+        """
+        with self._stage('pyramid') as metrics:
+            original_dzi, original_tiles = write_deepzoom_pyramid(
+                self.img, pyramid_dir, 'original')
+            processed_dzi, processed_tiles = write_deepzoom_pyramid(
+                self.corrected_img, pyramid_dir, 'processed')
+            metrics['pixels'] = 2 * self.img.size[0] * self.img.size[1]
+            metrics['array_bytes'] = (original_tiles + processed_tiles) * TILE_SIZE * TILE_SIZE * 3
+        self._log(f"Saved tile pyramids: {pyramid_dir}")
+        return {'original': original_dzi, 'processed': processed_dzi}
+
     def process(self):
         """Main processing pipeline."""
-        print(f"Processing image: {self.filepath}")
-        print(f"Scalar: {self.scalar}")
+        self._log(f"Processing image: {self.filepath}")
+        self._log(f"Scalar: {self.scalar}")
         
         self.load_and_resize_image()
-        self.analyze_tonal_ranges()
+        if self.profile is None:
+            self.analyze_tonal_ranges()
+        else:
+            self._log(f"Using correction profile: {self.profile.get('name')}")
         self.apply_correction()
         output_path = self.save_image()
+        if self.pyramid_dir:
+            self.save_pyramids(self.pyramid_dir)
         
-        print("Processing complete!")
+        self._log("Processing complete!")
         return output_path
     
     def process_with_memory_optimization(self, max_dimension=3280):
@@ -235,14 +704,25 @@ class GreyShift:
         Returns:
             str: Path to the processed full-resolution image
         """
-        print(f"Processing image with memory optimization: {self.filepath}")
-        print(f"Max dimension for analysis: {max_dimension}px")
-        print(f"Scalar: {self.scalar}")
+        self._log(f"Processing image with memory optimization: {self.filepath}")
+        self._log(f"Max dimension for analysis: {max_dimension}px")
+        self._log(f"Scalar: {self.scalar}")
+        
+        if self.profile is not None:
+            # Offsets are already known, so skip the analysis decode entirely
+            self._log(f"Using correction profile: {self.profile.get('name')}")
+            self.img = self._open_image()
+            self.apply_correction()
+            output_path = self.save_image()
+            if self.pyramid_dir:
+                self.save_pyramids(self.pyramid_dir)
+            self._log("Processing complete!")
+            return output_path
         
         # First, check original dimensions without loading full image
         with Image.open(self.filepath) as img_check:
             original_width, original_height = img_check.size
-            print(f"Original image: {original_width}x{original_height} pixels")
+            self._log(f"Original image: {original_width}x{original_height} pixels")
         
         # Check if resizing is needed for analysis
         max_original_dimension = max(original_width, original_height)
@@ -253,16 +733,18 @@ class GreyShift:
             analysis_width = int(original_width * scale_factor)
             analysis_height = int(original_height * scale_factor)
             
-            print(f"Resizing for analysis: {analysis_width}x{analysis_height}")
+            self._log(f"Resizing for analysis: {analysis_width}x{analysis_height}")
             
             # Load and resize for analysis only
-            with Image.open(self.filepath) as original_img:
-                if original_img.mode != 'RGB':
-                    original_img = original_img.convert('RGB')
+            original_img = self._open_image()
+            with self._stage('resize') as metrics:
                 analysis_img = original_img.resize(
                     (analysis_width, analysis_height), 
                     Image.Resampling.LANCZOS
                 )
+                metrics['pixels'] = analysis_width * analysis_height
+                metrics['array_bytes'] = metrics['pixels'] * 3
+            del original_img
             
             # Analyze the resized version
             self.img = analysis_img
@@ -273,31 +755,120 @@ class GreyShift:
             del self.img
             
             # STEP 2: Apply correction to original (load fresh)
-            print(f"Applying correction to original {original_width}x{original_height}")
-            with Image.open(self.filepath) as original_img:
-                if original_img.mode != 'RGB':
-                    original_img = original_img.convert('RGB')
-                self.img = original_img
-                self.apply_correction()
-                output_path = self.save_image()
+            self._log(f"Applying correction to original {original_width}x{original_height}")
+            self.img = self._open_image()
+            self.apply_correction()
+            output_path = self.save_image()
+            if self.pyramid_dir:
+                self.save_pyramids(self.pyramid_dir)
             
         else:
             # Image is small enough, process normally
-            print("Image within size limit, processing at full resolution")
+            self._log("Image within size limit, processing at full resolution")
             self.load_and_resize_image()
             self.analyze_tonal_ranges()
             self.apply_correction()
             output_path = self.save_image()
+            if self.pyramid_dir:
+                self.save_pyramids(self.pyramid_dir)
         
-        print("Processing complete!")
+        self._log("Processing complete!")
         return output_path
 
+    def process_sweep(self, scalars, workers=1, contact_sheet=False, max_dimension=None):
+        """Decode and analyze once, then save one corrected image per scalar.
+        
+        Every strength is rendered from the same decoded image through a
+        lookup table, so N scalars cost one decode and one analysis instead
+        of N full runs.
+        
+        Args:
+            scalars (list): Correction intensities, each in (0.0, 1.0]
+            workers (int): Threads rendering and encoding in parallel
+            contact_sheet (bool): Also save a labelled grid of the original
+                and every result
+            max_dimension (int): Analyze a copy downscaled to this size and
+                render at full resolution, as process_with_memory_optimization
+                does (default: analyze the loaded image, as process does)
+        
+        Returns:
+            dict: 'outputs' as (scalar, path) pairs in the order given, and
+            'contact_sheet' as the sheet's path or None
+        """
+        scalars = parse_scalars(scalars)
+        self._log(f"Processing image sweep: {self.filepath}")
+        self._log(f"Scalars: {', '.join(str(scalar) for scalar in scalars)}")
+        
+        if max_dimension is None:
+            self.load_and_resize_image()
+        else:
+            self.img = self._open_image()
+        
+        if self.profile is not None:
+            self._log(f"Using correction profile: {self.profile.get('name')}")
+        elif max_dimension is not None and max(self.img.size) > max_dimension:
+            # Analyze a downscaled copy of the decoded image, render the original
+            scale_factor = max_dimension / max(self.img.size)
+            analysis_size = (int(self.img.size[0] * scale_factor),
+                             int(self.img.size[1] * scale_factor))
+            self._log(f"Resizing for analysis: {analysis_size[0]}x{analysis_size[1]}")
+            with self._stage('resize') as metrics:
+                analysis_img = self.img.resize(analysis_size, Image.Resampling.LANCZOS)
+                metrics['pixels'] = analysis_size[0] * analysis_size[1]
+                metrics['array_bytes'] = metrics['pixels'] * 3
+            full_img, self.img = self.img, analysis_img
+            self.analyze_tonal_ranges()
+            self.img = full_img
+            del analysis_img
+        else:
+            self.analyze_tonal_ranges()
+        
+        def render(scalar):
+            corrected_img = self.render_scalar(scalar)
+            output_path = self.save_image(corrected_img, scalar)
+            thumbnail = None
+            if contact_sheet:
+                corrected_img.thumbnail((CONTACT_SHEET_THUMBNAIL, CONTACT_SHEET_THUMBNAIL))
+                thumbnail = corrected_img
+            return output_path, thumbnail
+        
+        if workers > 1 and len(scalars) > 1:
+            # Pillow releases the GIL while remapping and encoding
+            with ThreadPoolExecutor(max_workers=min(workers, len(scalars))) as executor:
+                rendered = list(executor.map(render, scalars))
+        else:
+            rendered = [render(scalar) for scalar in scalars]
+        
+        result = {
+            'outputs': [(scalar, output_path)
+                        for scalar, (output_path, _) in zip(scalars, rendered)],
+            'contact_sheet': None,
+        }
+        if contact_sheet:
+            original_thumbnail = self.img.copy()
+            original_thumbnail.thumbnail((CONTACT_SHEET_THUMBNAIL, CONTACT_SHEET_THUMBNAIL))
+            cells = [('original', original_thumbnail)]
+            cells += [(f"scalar {scalar}", thumbnail)
+                      for scalar, (_, thumbnail) in zip(scalars, rendered)]
+            path = Path(self.filepath)
+            output_dir = Path(self.output_dir) if self.output_dir else path.parent
+            sheet_path = output_dir / f"{path.stem}_sweep_contact_sheet.jpg"
+            make_contact_sheet(cells).save(sheet_path, quality=90)
+            result['contact_sheet'] = str(sheet_path)
+            self._log(f"Saved contact sheet: {sheet_path}")
+        
+        self._log("Processing complete!")
+        return result
 
-def main():
-    """Main entry point for command-line usage."""
+
+def build_parser():
+    """Build the command-line argument parser (shared with the daemon)."""
     parser = argparse.ArgumentParser(
         description="greyShift - Remove color casts from images",
-        epilog="Example: python greyshift.py --filepath image.jpg --scalar 0.8"
+        epilog="Example: python greyshift.py --filepath image.jpg --scalar 0.8\n"
+               "Run 'python greyshift.py serve --help' for daemon mode and\n"
+               "'python greyshift.py watch --help' for watch-folder mode.",
+        formatter_class=argparse.RawDescriptionHelpFormatter
     )
     
     parser.add_argument(
@@ -325,22 +896,150 @@ def main():
         help='Correction intensity (0.0 to 1.0, default: 1.0)'
     )
     
-    args = parser.parse_args()
+    parser.add_argument(
+        '--scalars',
+        help='Comma-separated correction intensities to sweep, e.g. 0.25,0.5,0.75,1.0; '
+             'the image is decoded and analyzed once and one file is saved per scalar'
+    )
+    
+    parser.add_argument(
+        '--workers',
+        type=int,
+        default=1,
+        help='Threads rendering sweep results in parallel (default: 1)'
+    )
+    
+    parser.add_argument(
+        '--contact-sheet',
+        action='store_true',
+        help='With --scalars, also save a labelled grid of the original and every result'
+    )
+    
+    parser.add_argument(
+        '--bands',
+        metavar='SPEC',
+        help='Tonal bands to analyze as comma-separated [name=]LOW-HIGH[:TARGET][*WEIGHT] '
+             '(default: 54-74:64,119-139:129,183-203:193)'
+    )
+    
+    parser.add_argument(
+        '--save-profile',
+        metavar='NAME',
+        help='Analyze the image and save its offsets as a correction profile '
+             '(name stored in the profiles directory, or a .json path)'
+    )
+    
+    parser.add_argument(
+        '--load-profile',
+        metavar='NAME',
+        help='Apply offsets from a saved correction profile instead of analyzing'
+    )
+    
+    parser.add_argument(
+        '--pyramid-dir',
+        metavar='DIR',
+        help='Also write DeepZoom tile pyramids of the original and corrected image to DIR'
+    )
+    
+    parser.add_argument(
+        '--quiet',
+        action='store_true',
+        help='Suppress progress output'
+    )
+    
+    parser.add_argument(
+        '--timings',
+        action='store_true',
+        help='Print per-stage timing and memory summary after processing'
+    )
+    
+    return parser
+
+
+def run_cli(args, hooks=None):
+    """Run one CLI invocation from parsed arguments.
+    
+    Args:
+        args (argparse.Namespace): Arguments from build_parser()
+        hooks (list): Extra stage hooks to register (optional)
+    
+    Returns:
+        dict: 'output_path', 'output_paths' and 'contact_sheet_path' for a
+        sweep, or 'profile_path'; plus the TimingSummary as 'timings' when
+        --timings was given
+    """
+    if args.scalars and (args.save_profile or args.pyramid_dir):
+        raise ValueError("--scalars cannot be combined with --save-profile or --pyramid-dir")
+    if args.bands and args.load_profile:
+        raise ValueError("--bands has no effect with --load-profile; "
+                         "set the bands when saving the profile")
+    
+    hooks = list(hooks or [])
+    timings = TimingSummary() if args.timings else None
+    if timings:
+        hooks.append(timings)
+    
+    # Create and run the greyShift processor
+    processor = GreyShift(
+        filepath=args.filepath,
+        width=args.w,
+        height=args.h,
+        scalar=args.scalar,
+        quiet=args.quiet,
+        hooks=hooks,
+        profile=args.load_profile,
+        pyramid_dir=args.pyramid_dir,
+        bands=args.bands
+    )
+    
+    result = {'timings': timings}
+    if args.save_profile:
+        # Reference image: analyze only and store the offsets
+        processor.load_and_resize_image()
+        processor.analyze_tonal_ranges()
+        result['profile_path'] = processor.save_profile(args.save_profile)
+    elif args.scalars:
+        sweep = processor.process_sweep(args.scalars, workers=args.workers,
+                                        contact_sheet=args.contact_sheet)
+        result['output_paths'] = [output_path for _, output_path in sweep['outputs']]
+        result['contact_sheet_path'] = sweep['contact_sheet']
+    else:
+        result['output_path'] = processor.process()
+    return result
+
+
+def main(argv=None):
+    """Main entry point for command-line usage."""
+    argv = sys.argv[1:] if argv is None else argv
+    if argv and argv[0] == 'serve':
+        # Long-running daemon mode; see greyshift_daemon.py
+        from greyshift_daemon import serve_main
+        return serve_main(argv[1:])
+    if argv and argv[0] == 'watch':
+        # Watch-folder ingestion mode; see greyshift_watch.py
+        from greyshift_watch import watch_main
+        return watch_main(argv[1:])
+    
+    args = build_parser().parse_args(argv)
     
     try:
-        # Create and run the greyShift processor
-        processor = GreyShift(
-            filepath=args.filepath,
-            width=args.w,
-            height=args.h,
-            scalar=args.scalar
-        )
-        
-        output_path = processor.process()
-        print(f"\n✅ Success! Corrected image saved to: {output_path}")
+        result = run_cli(args)
+        if not args.quiet:
+            if 'profile_path' in result:
+                print(f"\n✅ Success! Correction profile saved to: {result['profile_path']}")
+            elif 'output_paths' in result:
+                print(f"\n✅ Success! {len(result['output_paths'])} corrected images saved:")
+                for output_path in result['output_paths']:
+                    print(f"   {output_path}")
+                if result['contact_sheet_path']:
+                    print(f"   Contact sheet: {result['contact_sheet_path']}")
+            else:
+                print(f"\n✅ Success! Corrected image saved to: {result['output_path']}")
+        if result['timings']:
+            print(result['timings'].report())
         
     except Exception as e:
-        print(f"❌ Error: {e}")
+        print(f"❌ Error: {e}", file=sys.stderr if args.quiet else sys.stdout)
         sys.exit(1)
 
 
@@ -0,0 +1,101 @@
+#!/usr/bin/env python3
+"""
+greyShift thin client - forwards command-line arguments to a running daemon.
+
+Takes the same arguments as greyshift.py. Start the daemon with
+``python greyshift.py serve``; when no daemon is listening, the request runs
+in-process instead. Only the standard library is imported up front, so a
+request to a warm daemon skips the NumPy and Pillow import cost.
+"""
+
+import json
+import os
+import socket
+import sys
+import tempfile
+
+
+def default_socket_path():
+    """Return the daemon socket path from GREYSHIFT_SOCKET or a per-user default."""
+    return os.environ.get(
+        'GREYSHIFT_SOCKET',
+        os.path.join(tempfile.gettempdir(), f"greyshift-{os.getuid()}.sock")
+    )
+
+
+def connect(socket_path=None):
+    """Connect to the daemon; raises OSError if none is listening."""
+    client = socket.socket(socket.AF_UNIX, socket.SOCK_STREAM)
+    try:
+        client.connect(socket_path or default_socket_path())
+    except OSError:
+        client.close()
+        raise
+    return client
+
+
+def send_request(client, request):
+    """Send one JSON request line and return the decoded JSON response."""
+    with client, client.makefile('rwb') as stream:
+        stream.write(json.dumps(request).encode() + b'\n')
+        stream.flush()
+        line = stream.readline()
+    if not line:
+        raise ConnectionError("greyshift daemon closed the connection")
+    return json.loads(line)
+
+
+def run_in_process(argv):
+    """Fall back to running the full CLI in this process."""
+    import greyshift
+    return greyshift.main(argv)
+
+
+def main(argv=None):
+    """Forward a CLI invocation to the daemon, or run it in-process."""
+    argv = sys.argv[1:] if argv is None else argv
+    
+    # Help output, daemon management and watch mode are handled by the full CLI
+    if not argv or argv[0] in ('serve', 'watch') or '-h' in argv or '--help' in argv:
+        return run_in_process(argv)
+    
+    try:
+        client = connect()
+    except OSError:
+        return run_in_process(argv)
+    
+    quiet = '--quiet' in argv
+    try:
+        response = send_request(client, {'argv': argv, 'cwd': os.getcwd()})
+    except (OSError, ValueError) as e:
+        print(f"❌ Error: {e}", file=sys.stderr if quiet else sys.stdout)
+        sys.exit(1)
+    
+    if response.get('daemon_error'):
+        # The daemon itself failed (e.g. a worker was killed), not the request
+        print(f"⚠️ {response['error']}; running in-process", file=sys.stderr)
+        return run_in_process(argv)
+    
+    if not response['ok']:
+        print(f"❌ Error: {response['error']}", file=sys.stderr if quiet else sys.stdout)
+        sys.exit(1)
+    
+    if not quiet:
+        if 'profile_path' in response:
+            print(f"✅ Success! Correction profile saved to: {response['profile_path']}")
+        elif 'output_paths' in response:
+            print(f"✅ Success! {len(response['output_paths'])} corrected images saved:")
+            for output_path in response['output_paths']:
+                print(f"   {output_path}")
+            if response.get('contact_sheet_path'):
+                print(f"   Contact sheet: {response['contact_sheet_path']}")
+        else:
+            print(f"✅ Success! Corrected image saved to: {response['output_path']}")
+        print(f"Processed by greyshift daemon (pid {response['pid']}) "
+              f"in {response['wall_time']:.3f}s")
+    if response.get('timing_report'):
+        print(response['timing_report'])
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,213 @@
+#!/usr/bin/env python3
+"""
+greyShift daemon - keeps warm worker processes for command-line requests.
+
+Start with ``python greyshift.py serve``. greyshift_client.py sends the same
+arguments greyshift.py accepts over a local Unix socket, and receives the
+output path and stage timings back as one JSON line.
+"""
+
+import argparse
+import contextlib
+import io
+import json
+import os
+import signal
+import socket
+import socketserver
+import sys
+import threading
+import time
+from concurrent.futures import ProcessPoolExecutor
+from concurrent.futures.process import BrokenProcessPool
+
+from greyshift import TimingSummary, build_parser, run_cli
+from greyshift_client import default_socket_path
+
+
+def _warm_worker():
+    """No-op job used to start every worker process up front."""
+    return os.getpid()
+
+
+def run_request(argv, cwd):
+    """Run one forwarded CLI invocation inside a worker process.
+    
+    Args:
+        argv (list): Arguments as they would be passed to greyshift.py
+        cwd (str): Client working directory, used to resolve relative paths
+    
+    Returns:
+        dict: JSON-ready response for the client
+    """
+    start_time = time.perf_counter()
+    
+    # Workers run one job at a time, so changing directory is safe here
+    os.chdir(cwd)
+    
+    stderr = io.StringIO()
+    try:
+        with contextlib.redirect_stderr(stderr):
+            args = build_parser().parse_args(argv)
+    except SystemExit:
+        return {'ok': False, 'error': stderr.getvalue().strip() or 'Invalid arguments'}
+    
+    want_report = args.timings
+    args.quiet = True
+    args.timings = False
+    timings = TimingSummary()
+    try:
+        result = run_cli(args, hooks=[timings])
+    except Exception as e:
+        return {'ok': False, 'error': str(e)}
+    
+    response = {
+        'ok': True,
+        'pid': os.getpid(),
+        'wall_time': time.perf_counter() - start_time,
+        'timings': {stage: totals['wall_time']
+                    for stage, totals in timings.stages.items()},
+    }
+    if 'profile_path' in result:
+        response['profile_path'] = os.path.abspath(result['profile_path'])
+    elif 'output_paths' in result:
+        response['output_paths'] = [os.path.abspath(output_path)
+                                    for output_path in result['output_paths']]
+        if result['contact_sheet_path']:
+            response['contact_sheet_path'] = os.path.abspath(result['contact_sheet_path'])
+    else:
+        response['output_path'] = os.path.abspath(result['output_path'])
+    if want_report:
+        response['timing_report'] = timings.report()
+    return response
+
+
+class RequestHandler(socketserver.StreamRequestHandler):
+    """Read one JSON request line, run it on the pool and reply with JSON."""
+
+    def handle(self):
+        line = self.rfile.readline()
+        if not line:
+            return
+        try:
+            request = json.loads(line)
+            if request.get('ping'):
+                response = {'ok': True, 'pid': os.getpid()}
+            else:
+                response = self.server.run(request['argv'], request['cwd'])
+        except Exception as e:
+            # Not a problem with the request itself; the client retries in-process
+            response = {'ok': False, 'daemon_error': True, 'error': f"Daemon error: {e}"}
+        self.wfile.write(json.dumps(response).encode() + b'\n')
+
+
+class DaemonServer(socketserver.ThreadingUnixStreamServer):
+    """Unix socket server that hands requests to a pool of warm workers."""
+
+    daemon_threads = True
+
+    def __init__(self, socket_path, workers):
+        self.workers = workers
+        self._executor_lock = threading.Lock()
+        self.executor = self._start_executor()
+        # Requests can read and write any file the daemon can, so the socket
+        # must never be reachable by others, not even between bind and chmod.
+        # The umask is process-wide, so only hold it around the bind; the
+        # workers started above keep the normal umask for their output files.
+        old_umask = os.umask(0o077)
+        try:
+            super().__init__(socket_path, RequestHandler)
+        finally:
+            os.umask(old_umask)
+
+    def _start_executor(self):
+        """Start a worker pool and warm every process up front."""
+        executor = ProcessPoolExecutor(max_workers=self.workers)
+        # Start the pool now so the first request does not pay for it
+        for future in [executor.submit(_warm_worker) for _ in range(self.workers)]:
+            future.result()
+        return executor
+
+    def run(self, argv, cwd):
+        """Run one request on the pool, replacing the pool if a worker died."""
+        executor = self.executor
+        try:
+            return executor.submit(run_request, argv, cwd).result()
+        except BrokenProcessPool:
+            # A worker was killed (e.g. out of memory); the pool cannot be
+            # reused, so start a fresh one for later requests
+            with self._executor_lock:
+                if self.executor is executor:
+                    executor.shutdown(wait=False, cancel_futures=True)
+                    self.executor = self._start_executor()
+            raise
+
+
+def remove_stale_socket(socket_path):
+    """Remove a socket file left behind by a daemon that is no longer running."""
+    if not os.path.exists(socket_path):
+        return
+    probe = socket.socket(socket.AF_UNIX, socket.SOCK_STREAM)
+    try:
+        probe.connect(socket_path)
+    except OSError:
+        os.remove(socket_path)
+    else:
+        raise RuntimeError(f"A greyshift daemon is already listening on {socket_path}")
+    finally:
+        probe.close()
+
+
+def serve(socket_path=None, workers=2):
+    """Serve requests on a Unix socket until interrupted or terminated."""
+    socket_path = socket_path or default_socket_path()
+    remove_stale_socket(socket_path)
+    
+    server = DaemonServer(socket_path, workers)
+    
+    def stop(signum, frame):
+        threading.Thread(target=server.shutdown).start()
+    signal.signal(signal.SIGTERM, stop)
+    
+    print(f"greyshift daemon listening on {socket_path} with {workers} worker(s)")
+    sys.stdout.flush()
+    try:
+        server.serve_forever()
+    except KeyboardInterrupt:
+        pass
+    finally:
+        server.server_close()
+        server.executor.shutdown(cancel_futures=True)
+        if os.path.exists(socket_path):
+            os.remove(socket_path)
+        print("greyshift daemon stopped")
+
+
+def serve_main(argv=None):
+    """Entry point for ``python greyshift.py serve``."""
+    parser = argparse.ArgumentParser(
+        prog='greyshift.py serve',
+        description="Run a persistent greyShift daemon for greyshift_client.py"
+    )
+    parser.add_argument(
+        '--socket',
+        default=default_socket_path(),
+        help='Unix socket path (default: $GREYSHIFT_SOCKET or a per-user temp path)'
+    )
+    parser.add_argument(
+        '--workers',
+        type=int,
+        default=2,
+        help='Number of warm worker processes (default: 2)'
+    )
+    args = parser.parse_args(argv)
+    if args.workers < 1:
+        parser.error("--workers must be at least 1")
+    try:
+        serve(args.socket, args.workers)
+    except RuntimeError as e:
+        parser.exit(1, f"❌ Error: {e}\n")
+
+
+if __name__ == "__main__":
+    serve_main()
@@ -0,0 +1,372 @@
+#!/usr/bin/env python3
+"""
+greyShift watch mode - incrementally corrects images dropped into a folder.
+
+Start with ``python greyshift.py watch --input DIR --output DIR``. The folder
+is polled with os.scandir; a file is processed once its size and mtime have
+stopped changing. A JSON state index (path, size, mtime, content hash and
+correction settings) means files already corrected with the same settings are
+skipped after a restart.
+"""
+
+import argparse
+import hashlib
+import json
+import os
+import signal
+import sys
+import time
+from concurrent.futures import ProcessPoolExecutor
+from concurrent.futures.process import BrokenProcessPool
+from pathlib import Path
+
+from greyshift import GreyShift, load_profile
+
+IMAGE_EXTENSIONS = {'.png', '.jpg', '.jpeg', '.tiff', '.tif', '.bmp', '.webp'}
+STATE_FILENAME = '.greyshift_watch_state.json'
+
+
+def file_sha256(path):
+    """Return the SHA-256 hex digest of a file, read in 1MB chunks."""
+    digest = hashlib.sha256()
+    with open(path, 'rb') as image_file:
+        for chunk in iter(lambda: image_file.read(1024 * 1024), b''):
+            digest.update(chunk)
+    return digest.hexdigest()
+
+
+def ignore_interrupts():
+    """Worker initializer: let Ctrl+C stop the watcher, not running files."""
+    signal.signal(signal.SIGINT, signal.SIG_IGN)
+
+
+def process_file(input_path, output_dir, scalar, profile, max_dimension, known_hash):
+    """Correct one watched file; runs in a worker process.
+
+    Returns:
+        tuple: (content hash, output path or None if the content is unchanged)
+    """
+    content_hash = file_sha256(input_path)
+    if content_hash == known_hash:
+        # Touched or copied again, but the pixels are the same
+        return content_hash, None
+
+    os.makedirs(output_dir, exist_ok=True)
+    processor = GreyShift(filepath=input_path, scalar=scalar, quiet=True,
+                          profile=profile, output_dir=output_dir)
+    output_path = processor.process_with_memory_optimization(max_dimension=max_dimension)
+    return content_hash, output_path
+
+
+class FolderWatcher:
+    """Poll a folder and correct new or changed images on a worker pool."""
+
+    def __init__(self, input_dir, output_dir, scalar=1.0, profile=None,
+                 workers=2, max_pending=None, interval=2.0, settle_time=2.0,
+                 recursive=False, state_path=None, max_dimension=3280,
+                 quiet=False):
+        """
+        Initialize the watcher.
+
+        Args:
+            input_dir (str): Folder to watch for images
+            output_dir (str): Folder for corrected images
+            scalar (float): Correction intensity (0.0 to 1.0)
+            profile (str): Correction profile name or path (optional)
+            workers (int): Number of worker processes
+            max_pending (int): Files queued or running before new files wait
+                for a later poll (default: 4 per worker)
+            interval (float): Seconds between polls
+            settle_time (float): Seconds a file's mtime must be in the past
+                before it is considered fully written
+            recursive (bool): Also watch subfolders
+            state_path (str): State index file (default: in output_dir)
+            max_dimension (int): Maximum dimension for analysis
+            quiet (bool): Suppress progress output on stdout
+        """
+        self.input_dir = Path(input_dir).resolve()
+        self.output_dir = Path(output_dir).resolve()
+        self.scalar = scalar
+        self.profile = load_profile(profile) if profile else None
+        self.workers = workers
+        self.max_pending = max_pending or workers * 4
+        self.interval = interval
+        self.settle_time = settle_time
+        self.recursive = recursive
+        self.state_path = Path(state_path) if state_path else self.output_dir / STATE_FILENAME
+        self.max_dimension = max_dimension
+        self.quiet = quiet
+
+        if not self.input_dir.is_dir():
+            raise FileNotFoundError(f"Watch folder not found: {self.input_dir}")
+        if self.scalar <= 0 or self.scalar > 1:
+            raise ValueError("Scalar must be greater than 0 and less than or equal to 1")
+
+        # Correction settings recorded with each file; changing them on a
+        # restart reprocesses files corrected with the old settings
+        self.settings = {
+            'scalar': self.scalar,
+            'profile': self.profile.get('name') if self.profile else None,
+            'profile_offsets': self.profile['average_offsets'] if self.profile else None,
+            'max_dimension': self.max_dimension,
+        }
+        self.state = self._load_state()
+        # Files seen on the previous poll whose size/mtime may still change
+        self.candidates = {}
+        # Submitted futures, keyed by relative path
+        self.in_flight = {}
+        # Set when a worker died; run() then replaces the pool
+        self.pool_broken = False
+
+    def _log(self, message):
+        """Print a progress message unless running in quiet mode."""
+        if not self.quiet:
+            print(message)
+            sys.stdout.flush()
+
+    def _load_state(self):
+        """Load the state index, or start empty if there is none."""
+        if not self.state_path.exists():
+            return {}
+        with open(self.state_path) as state_file:
+            return json.load(state_file).get('files', {})
+
+    def _save_state(self):
+        """Write the state index atomically so a crash never truncates it."""
+        self.state_path.parent.mkdir(parents=True, exist_ok=True)
+        temp_path = self.state_path.with_name(self.state_path.name + '.tmp')
+        with open(temp_path, 'w') as state_file:
+            json.dump({'files': self.state}, state_file, indent=1)
+        os.replace(temp_path, self.state_path)
+
+    def scan(self):
+        """Yield (relative path, size, mtime_ns) for every image in the folder."""
+        directories = [self.input_dir]
+        while directories:
+            directory = directories.pop()
+            try:
+                entries = list(os.scandir(directory))
+            except OSError:
+                continue
+            for entry in entries:
+                if entry.name.startswith('.'):
+                    continue
+                if entry.is_dir(follow_symlinks=False):
+                    # Never re-ingest our own output
+                    if self.recursive and Path(entry.path) != self.output_dir:
+                        directories.append(entry.path)
+                    continue
+                if Path(entry.name).suffix.lower() not in IMAGE_EXTENSIONS:
+                    continue
+                if '_shifted_scalar(' in entry.name:
+                    continue
+                try:
+                    stat = entry.stat()
+                except OSError:
+                    continue
+                relative_path = os.path.relpath(entry.path, self.input_dir)
+                yield relative_path, stat.st_size, stat.st_mtime_ns
+
+    def find_ready_files(self):
+        """Return new or changed files that have finished being written.
+
+        A file is ready when its size and mtime match the previous poll and
+        the mtime is at least settle_time seconds old.
+        """
+        ready = []
+        seen = set()
+        now_ns = time.time_ns()
+        for relative_path, size, mtime_ns in self.scan():
+            seen.add(relative_path)
+            if relative_path in self.in_flight:
+                continue
+            record = self.state.get(relative_path)
+            if (record and record['size'] == size and record['mtime_ns'] == mtime_ns
+                    and record.get('settings') == self.settings):
+                continue
+
+            if self.candidates.get(relative_path) != (size, mtime_ns):
+                self.candidates[relative_path] = (size, mtime_ns)
+                continue
+            if now_ns - mtime_ns < self.settle_time * 1e9:
+                continue
+            ready.append((relative_path, size, mtime_ns))
+
+        # Forget candidates that were deleted before they settled
+        for relative_path in list(self.candidates):
+            if relative_path not in seen:
+                del self.candidates[relative_path]
+        return ready
+
+    def submit_ready_files(self, executor):
+        """Queue ready files, holding the rest back once max_pending is reached."""
+        ready = self.find_ready_files()
+        for index, (relative_path, size, mtime_ns) in enumerate(ready):
+            if len(self.in_flight) >= self.max_pending:
+                self._log(f"Queue full ({self.max_pending}), "
+                          f"deferring {len(ready) - index} file(s)")
+                break
+            record = self.state.get(relative_path, {})
+            # The content hash only lets a file be skipped under the same settings
+            known_hash = record.get('sha256') if record.get('settings') == self.settings else None
+            output_dir = self.output_dir / Path(relative_path).parent
+            try:
+                future = executor.submit(
+                    process_file, str(self.input_dir / relative_path), str(output_dir),
+                    self.scalar, self.profile, self.max_dimension, known_hash
+                )
+            except BrokenProcessPool:
+                # Left as a candidate and submitted again to the new pool
+                self.pool_broken = True
+                break
+            self.in_flight[relative_path] = (future, size, mtime_ns)
+            del self.candidates[relative_path]
+
+    def collect_finished(self):
+        """Record finished files in the state index; returns how many finished."""
+        finished = [relative_path for relative_path, (future, _, _) in self.in_flight.items()
+                    if future.done()]
+        for relative_path in finished:
+            future, size, mtime_ns = self.in_flight.pop(relative_path)
+            record = {'size': size, 'mtime_ns': mtime_ns, 'settings': self.settings}
+            try:
+                content_hash, output_path = future.result()
+            except BrokenProcessPool:
+                # A worker died (e.g. killed for memory), not necessarily on
+                # this file; leave it out of the index so it is queued again
+                self.pool_broken = True
+                self._log(f"⚠️ {relative_path}: worker process died, will retry")
+                continue
+            except Exception as e:
+                # Not retried until the file changes again
+                record['error'] = str(e)
+                self._log(f"❌ {relative_path}: {e}")
+            else:
+                record['sha256'] = content_hash
+                if output_path is None:
+                    record['output'] = self.state.get(relative_path, {}).get('output')
+                    self._log(f"Unchanged content, skipped: {relative_path}")
+                else:
+                    record['output'] = os.path.relpath(output_path, self.output_dir)
+                    self._log(f"✅ {relative_path} -> {output_path}")
+            self.state[relative_path] = record
+        if finished:
+            self._save_state()
+        return len(finished)
+
+    def _start_executor(self):
+        """Start a fresh worker pool."""
+        return ProcessPoolExecutor(max_workers=self.workers,
+                                   initializer=ignore_interrupts)
+
+    def run(self, once=False):
+        """Poll until interrupted, or until the folder is fully processed if once."""
+        self._log(f"Watching {self.input_dir} -> {self.output_dir} "
+                  f"({self.workers} worker(s), scalar {self.scalar})")
+        executor = self._start_executor()
+        try:
+            while True:
+                self.collect_finished()
+                self.submit_ready_files(executor)
+                if self.pool_broken:
+                    # Waiting for shutdown makes every future of the old pool
+                    # done, so the next collect drops them for resubmission
+                    self._log("⚠️ Worker pool broke, starting a new one")
+                    executor.shutdown(wait=True)
+                    executor = self._start_executor()
+                    self.pool_broken = False
+                if once and not self.in_flight and not self.candidates:
+                    break
+                time.sleep(self.interval)
+        except KeyboardInterrupt:
+            self._log("Stopping, waiting for running files to finish...")
+            for future, _, _ in self.in_flight.values():
+                future.cancel()
+        finally:
+            executor.shutdown(wait=True)
+            # Cancelled files stay out of the index and are redone next run
+            self.in_flight = {relative_path: entry
+                              for relative_path, entry in self.in_flight.items()
+                              if not entry[0].cancelled()}
+            self.collect_finished()
+
+
+def watch_main(argv=None):
+    """Entry point for ``python greyshift.py watch``."""
+    parser = argparse.ArgumentParser(
+        prog='greyshift.py watch',
+        description="Watch a folder and correct new or changed images"
+    )
+    parser.add_argument('--input', required=True, help='Folder to watch')
+    parser.add_argument('--output', required=True, help='Folder for corrected images')
+    parser.add_argument(
+        '--scalar',
+        type=float,
+        default=1.0,
+        help='Correction intensity (0.0 to 1.0, default: 1.0)'
+    )
+    parser.add_argument(
+        '--load-profile',
+        metavar='NAME',
+        help='Apply offsets from a saved correction profile instead of analyzing'
+    )
+    parser.add_argument(
+        '--workers',
+        type=int,
+        default=2,
+        help='Number of worker processes (default: 2)'
+    )
+    parser.add_argument(
+        '--max-pending',
+        type=int,
+        help='Files queued or running before new files wait (default: 4 per worker)'
+    )
+    parser.add_argument(
+        '--interval',
+        type=float,
+        default=2.0,
+        help='Seconds between folder polls (default: 2)'
+    )
+    parser.add_argument(
+        '--settle',
+        type=float,
+        default=2.0,
+        help='Seconds since last modification before a file is processed (default: 2)'
+    )
+    parser.add_argument('--recursive', action='store_true', help='Also watch subfolders')
+    parser.add_argument(
+        '--state',
+        help='State index file (default: .greyshift_watch_state.json in the output folder)'
+    )
+    parser.add_argument(
+        '--once',
+        action='store_true',
+        help='Process everything currently in the folder, then exit'
+    )
+    parser.add_argument('--quiet', action='store_true', help='Suppress progress output')
+    args = parser.parse_args(argv)
+    if args.workers < 1:
+        parser.error("--workers must be at least 1")
+
+    try:
+        watcher = FolderWatcher(
+            input_dir=args.input,
+            output_dir=args.output,
+            scalar=args.scalar,
+            profile=args.load_profile,
+            workers=args.workers,
+            max_pending=args.max_pending,
+            interval=args.interval,
+            settle_time=args.settle,
+            recursive=args.recursive,
+            state_path=args.state,
+            quiet=args.quiet
+        )
+        watcher.run(once=args.once)
+    except Exception as e:
+        print(f"❌ Error: {e}", file=sys.stderr if args.quiet else sys.stdout)
+        sys.exit(1)
+
+
+if __name__ == "__main__":
+    watch_main()
@@ -30,15 +30,15 @@ do {
         }
         "2" {
             Write-Host "Viewing processing events only (press Ctrl+C to stop)..." -ForegroundColor Cyan
-            docker-compose logs -f | Select-String "Processing"
+            docker-compose logs -f | Select-String '"path": "/upload"'
         }
         "3" {
             Write-Host "Viewing user activity (press Ctrl+C to stop)..." -ForegroundColor Cyan
-            docker-compose logs -f | Select-String "(Page visit|Download)"
+            docker-compose logs -f | Select-String '"path": "/(download/[^"]*)?"'
         }
         "4" {
             Write-Host "Viewing errors and warnings only (press Ctrl+C to stop)..." -ForegroundColor Cyan
-            docker-compose logs -f | Select-String "(ERROR|WARNING)"
+            docker-compose logs -f | Select-String '"level": "(ERROR|WARNING)"'
         }
         "5" {
             Write-Host "Last 20 log entries:" -ForegroundColor Cyan
@@ -46,7 +46,7 @@ do {
         }
         "6" {
             Write-Host "Recent processing performance:" -ForegroundColor Cyan
-            docker-compose logs | Select-String "Processing completed" | Select-Object -Last 10
+            docker-compose logs | Select-String '"processing_time_s"' | Select-Object -Last 10
         }
         "7" {
             Write-Host "Exiting..." -ForegroundColor Yellow
@@ -29,15 +29,15 @@ while true; do
             ;;
         2)
             echo -e "\e[36mViewing processing events only (press Ctrl+C to stop)...\e[0m"
-            docker-compose logs -f | grep "Processing"
+            docker-compose logs -f | grep '"path": "/upload"'
             ;;
         3)
             echo -e "\e[36mViewing user activity (press Ctrl+C to stop)...\e[0m"
-            docker-compose logs -f | grep -E "(Page visit|Download)"
+            docker-compose logs -f | grep -E '"path": "/(download/[^"]*)?"'
             ;;
         4)
             echo -e "\e[36mViewing errors and warnings only (press Ctrl+C to stop)...\e[0m"
-            docker-compose logs -f | grep -E "(ERROR|WARNING)"
+            docker-compose logs -f | grep -E '"level": "(ERROR|WARNING)"'
             ;;
         5)
             echo -e "\e[36mLast 20 log entries:\e[0m"
@@ -45,7 +45,7 @@ while true; do
             ;;
         6)
             echo -e "\e[36mRecent processing performance:\e[0m"
-            docker-compose logs | grep "Processing completed" | tail -10
+            docker-compose logs | grep '"processing_time_s"' | tail -10
             ;;
         7)
             echo -e "\e[33mExiting...\e[0m"
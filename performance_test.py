@@ -4,12 +4,11 @@ Performance comparison test for greyShift optimizations.
 Creates a simple test image and measures processing time.
 """
 
-import time
 import numpy as np
 from PIL import Image
 import tempfile
 import os
-from greyshift import GreyShift
+from greyshift import GreyShift, TimingSummary
 
 def create_test_image(width=1000, height=1000):
     """Create a test image with color cast for performance testing."""
@@ -34,33 +33,28 @@ def benchmark_greyshift(image_path, test_name, width=None, height=None):
     print(f"\n{test_name}")
     print("-" * 50)
     
-    # Time the processing
-    start_time = time.time()
-    
     try:
+        timings = TimingSummary()
         processor = GreyShift(
             filepath=image_path,
             width=width,
             height=height,
-            scalar=0.8
+            scalar=0.8,
+            quiet=True,
+            hooks=[timings]
         )
         
-        load_time = time.time()
         processor.load_and_resize_image()
-        
-        analyze_time = time.time()
         processor.analyze_tonal_ranges()
-        
-        correct_time = time.time()
         processor.apply_correction()
         
-        end_time = time.time()
-        
-        # Calculate times
-        total_time = end_time - start_time
-        load_duration = analyze_time - load_time
-        analyze_duration = correct_time - analyze_time
-        correct_duration = end_time - correct_time
+        # Stage timings come from the built-in timing hooks
+        stages = timings.stages
+        total_time = timings.total_wall_time()
+        load_duration = sum(stages[name]['wall_time']
+                            for name in ('open', 'resize') if name in stages)
+        analyze_duration = stages['analyze']['wall_time']
+        correct_duration = stages['correct']['wall_time']
         
         print(f"Total processing time: {total_time:.3f} seconds")
         print(f"  - Loading/resizing: {load_duration:.3f} seconds")
@@ -1,43 +1,217 @@
+import os
+import hashlib
+import threading
+import time
+from collections import OrderedDict
 import streamlit as st
 import requests
-from PIL import Image
+from requests.adapters import HTTPAdapter
 from io import BytesIO
+from PIL import Image
 
 """
-# Flip an image
+# Flip or greyShift an image
 """
 
+# Base URLs of the flip service (flask_app.py) and the greyShift app (app.py)
+FLIP_SERVICE_URL = os.environ.get('FLIP_SERVICE_URL', 'http://127.0.0.1:5001')
+GREYSHIFT_URL = os.environ.get('GREYSHIFT_URL', 'http://127.0.0.1:5000')
+
+# Server responses are memoized per image content hash (and scalar). The
+# greyShift app deletes its files after an hour, so cached results expire too.
+CACHE_MAX_ENTRIES = 32
+CACHE_MAX_MB = float(os.environ.get('STREAMLIT_CACHE_MAX_MB', 256))
+CACHE_TTL_SECONDS = 3600
+REQUEST_TIMEOUT = 120
+PREVIEW_SIZE = 720
+
+
+class ByteBoundedCache:
+    """Thread-safe LRU of bytes values, bounded by total size and age."""
+
+    def __init__(self, max_bytes, ttl):
+        self.max_bytes = max_bytes
+        self.ttl = ttl
+        self.entries = OrderedDict()
+        self.total_bytes = 0
+        self._lock = threading.Lock()
+
+    def get(self, key):
+        with self._lock:
+            entry = self.entries.get(key)
+            if entry is None:
+                return None
+            stored_at, value = entry
+            if time.monotonic() - stored_at > self.ttl:
+                self._remove(key)
+                return None
+            self.entries.move_to_end(key)
+            return value
+
+    def put(self, key, value):
+        with self._lock:
+            if key in self.entries:
+                self._remove(key)
+            if len(value) > self.max_bytes:
+                return
+            self.entries[key] = (time.monotonic(), value)
+            self.total_bytes += len(value)
+            while self.total_bytes > self.max_bytes:
+                self._remove(next(iter(self.entries)))
+
+    def _remove(self, key):
+        _, value = self.entries.pop(key)
+        self.total_bytes -= len(value)
+
+
+@st.cache_resource
+def get_session():
+    """Return one pooled HTTP session shared across reruns."""
+    session = requests.Session()
+    adapter = HTTPAdapter(pool_connections=4, pool_maxsize=8)
+    session.mount('http://', adapter)
+    session.mount('https://', adapter)
+    return session
+
+
+@st.cache_resource
+def get_result_cache():
+    """Return the shared cache of downloaded image bytes."""
+    return ByteBoundedCache(int(CACHE_MAX_MB * 1024 * 1024), CACHE_TTL_SECONDS)
+
+
+def flip_image(digest, image_bytes, filename):
+    """Send the image to the flip service and return the flipped bytes."""
+    cache = get_result_cache()
+    flipped = cache.get(('flip', digest))
+    if flipped is None:
+        response = get_session().post(
+            f'{FLIP_SERVICE_URL}/flip-vertical',
+            files={'file': (filename, image_bytes)},
+            timeout=REQUEST_TIMEOUT
+        )
+        response.raise_for_status()
+        flipped = response.content
+        cache.put(('flip', digest), flipped)
+    return flipped
+
+
+# Arguments starting with an underscore are not hashed by Streamlit, so the
+# cache key is the content digest rather than the whole image. Offsets are
+# small, so an entry count bound is enough here.
+@st.cache_data(max_entries=CACHE_MAX_ENTRIES, ttl=CACHE_TTL_SECONDS,
+               show_spinner=False)
+def analyze_image(digest, _image_bytes, filename):
+    """Return the greyShift correction offsets for the image."""
+    response = get_session().post(
+        f'{GREYSHIFT_URL}/analyze',
+        files={'file': (filename, _image_bytes)},
+        timeout=REQUEST_TIMEOUT
+    )
+    response.raise_for_status()
+    return response.json()
+
+
+@st.cache_data(max_entries=CACHE_MAX_ENTRIES, ttl=CACHE_TTL_SECONDS,
+               show_spinner=False)
+def make_preview_source(digest, _image_bytes):
+    """Decode the upload once into a small RGB image for local previews."""
+    with Image.open(BytesIO(_image_bytes)) as img:
+        img.thumbnail((PREVIEW_SIZE, PREVIEW_SIZE))
+        return img.convert('RGB')
+
+
+def render_preview(source, offsets, scalar):
+    """Apply the offsets at this scalar to the preview image, as greyShift does."""
+    table = []
+    for key in ('red_avg_offset', 'green_avg_offset', 'blue_avg_offset'):
+        shift = offsets[key] * scalar
+        table.extend(min(255, max(0, round(level - shift))) for level in range(256))
+    return source.point(table)
+
+
+def correct_image(digest, scalar, image_bytes, filename):
+    """Run greyShift on the full-resolution image and download the result."""
+    cache = get_result_cache()
+    key = ('correct', digest, scalar)
+    cached = cache.get(key)
+    if cached is not None:
+        return cached
+
+    session = get_session()
+    response = session.post(
+        f'{GREYSHIFT_URL}/upload',
+        files={'file': (filename, image_bytes)},
+        data={'scalar': scalar},
+        timeout=REQUEST_TIMEOUT
+    )
+    response.raise_for_status()
+    result = response.json()
+
+    download = session.get(f"{GREYSHIFT_URL}{result['download_url']}",
+                           timeout=REQUEST_TIMEOUT)
+    download.raise_for_status()
+
+    download_name = filename
+    disposition = download.headers.get('Content-Disposition', '')
+    if 'filename=' in disposition:
+        download_name = disposition.split('filename=', 1)[1].strip('"')
+
+    # Name and bytes share one entry so the size bound covers both
+    corrected = download_name.encode() + b'\0' + download.content
+    cache.put(key, corrected)
+    return corrected
+
+
 with st.container(border=True):
     uploaded_image = st.file_uploader(label='Image file')
+    mode = st.radio('Operation', ['Flip vertical', 'greyShift correction'],
+                    horizontal=True)
+    scalar = st.slider('Correction intensity', 0.05, 1.0, 0.7, 0.05,
+                       disabled=mode != 'greyShift correction')
 
 st.write('')
 
 if uploaded_image:
 
-    # URL of the Flask API endpoint
-    url = 'http://127.0.0.1:5000/flip-vertical'
+    # Send the upload straight from memory
+    image_bytes = uploaded_image.getvalue()
+    digest = hashlib.sha256(image_bytes).hexdigest()
 
-    # Path to the image file you want to upload
-    image_path = r"C:\Users\Tom Eleff\Downloads\default.png"
-    image_object = Image.open(uploaded_image)
-    image_object.save(image_path)
-
-    # Send a POST request to the Flask API with the image file
-    files = {'file': open(image_path, 'rb')}
-    response = requests.post(url, files=files)
-
-    # Check if the request was successful
-    if response.status_code == 200:
-        try:
+    try:
+        if mode == 'Flip vertical':
+            flipped_image_bytes = flip_image(digest, image_bytes,
+                                             uploaded_image.name)
+            with st.container(border=True):
+                st.image(BytesIO(flipped_image_bytes))
 
-            # Read the returned image from the response
-            flipped_image_bytes = BytesIO(
-                response.json()['flipped_image'].encode('latin1')
-            )
+        else:
+            # One server analysis per image; slider moves only re-render locally
+            offsets = analyze_image(digest, image_bytes, uploaded_image.name)
+            scalar = round(scalar, 2)
+            preview = render_preview(make_preview_source(digest, image_bytes),
+                                     offsets, scalar)
             with st.container(border=True):
-                st.image(flipped_image_bytes)
+                st.image(preview)
+                st.caption(
+                    f"Preview · offsets "
+                    f"R {offsets['red_avg_offset']:.2f}, "
+                    f"G {offsets['green_avg_offset']:.2f}, "
+                    f"B {offsets['blue_avg_offset']:.2f}"
+                )
+
+                # The full-resolution correction runs only on request
+                requested = st.session_state.get('download_request')
+                if st.button('Prepare full-resolution download'):
+                    requested = st.session_state['download_request'] = (digest, scalar)
+                if requested == (digest, scalar):
+                    with st.spinner('Correcting full-resolution image...'):
+                        corrected = correct_image(digest, scalar, image_bytes,
+                                                  uploaded_image.name)
+                    download_name, download_bytes = corrected.split(b'\0', 1)
+                    st.download_button('Download corrected image',
+                                       download_bytes,
+                                       file_name=download_name.decode())
 
-        except Exception as e:
-            print(f'Error processing the flipped image: {e}')
-    else:
-        print(f'Error: {response.status_code}, {response.text}')
+    except requests.RequestException as e:
+        st.error(f'Error: {e}')
@@ -0,0 +1,39 @@
+"""
+Streamed ZIP responses, shared by the greyShift app (app.py) and the flip
+service (flask_app.py).
+
+zipfile writes to a ChunkWriter instead of a file; the response generator
+drains it after each entry, so the archive is sent while it is being built.
+"""
+
+import zipfile
+from io import RawIOBase
+
+
+class ChunkWriter(RawIOBase):
+    """Write-only stream that collects zipfile output for a streamed response."""
+
+    def __init__(self):
+        self.chunks = []
+
+    def writable(self):
+        return True
+
+    def write(self, data):
+        self.chunks.append(bytes(data))
+        return len(data)
+
+    def drain(self):
+        """Return and forget everything written since the last drain."""
+        data = b''.join(self.chunks)
+        self.chunks = []
+        return data
+
+
+def open_stored_zip(writer):
+    """Open a ZIP archive for writing that stores entries uncompressed.
+
+    Images are already compressed, so deflating them costs CPU for next to
+    no size reduction.
+    """
+    return zipfile.ZipFile(writer, 'w', zipfile.ZIP_STORED)